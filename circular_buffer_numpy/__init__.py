@@ -4,3 +4,16 @@ del get_versions
 
 from . import circular_buffer
 from . import queue
+from . import ingest
+from . import threadsafe
+from . import memory
+from . import quantized
+from . import compressed
+from . import records
+from . import swinging_door
+from . import bit_buffer
+from . import archive
+from . import persist
+from . import spilling
+from . import wal
+from . import tiered
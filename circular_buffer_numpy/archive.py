@@ -0,0 +1,251 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""Archive
+    by Valentyn Stadnytskyi
+    created: October, 2026
+Background writer that follows a circular buffer by global index and
+streams the new points to rolling, size-capped .npy segment files. Every
+point is written once, straight from the memory of the buffer with large
+sequential writes, no copy of the buffer is made on the way (rows padded by
+the align option are copied a chunk at a time).
+The name of a segment holds the global index of its first point, every
+segment can be opened with numpy.load (also with mmap_mode).
+"""
+
+import logging
+from logging import debug, info, warn, warning, error
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+
+def open_segments(directory, prefix='segment'):
+    """
+    returns the segments written by an Archive as a list of
+    (global index of the first point, array) pairs, oldest first. The
+    arrays are memory-mapped read-only. The segment that is still being
+    written does not match its header yet and is skipped.
+
+    Parameters
+    ----------
+    directory :: string
+        directory of the segments
+    prefix :: string
+        prefix of the segment names
+
+    Returns
+    -------
+    segments :: list
+
+    Examples
+    --------
+    >>> for first, data in open_segments('/data/archive'):
+    ...     print(first, data.shape)
+    """
+    from os import listdir
+    from os.path import join
+    from numpy import load
+    segments = []
+    for name in listdir(directory):
+        if name.startswith(prefix + '_') and name.endswith('.npy'):
+            first = int(name[len(prefix) + 1:-4])
+            try:
+                segments.append((first, load(join(directory, name), mmap_mode='r')))
+            except ValueError:
+                debug('skipped the open segment {}'.format(name))
+    return sorted(segments, key=lambda segment: segment[0])
+
+
+class Archive(object):
+    """
+    writes the points of a circular buffer to segment files in a
+    background thread. A segment is closed when it reaches segment_bytes,
+    and the next one starts. Points that are overwritten in the buffer
+    before they are written are lost and counted, also when the writer of
+    the buffer laps the archive while it copies them.
+
+    :ivar g_pointer: global index of the last point written, initial value: -1
+    :ivar lost: number of points overwritten before they were written
+    :ivar running: True while the loop is running
+
+    Examples
+    --------
+    >>> archive = Archive(buffer, '/data/archive', segment_bytes = 2**30)
+    >>> archive.start()
+    >>> archive.lag
+    >>> archive.stop()
+    """
+    def __init__(self, buffer, directory, segment_bytes=2**28, chunk_bytes=2**24, prefix='segment', interval=0.1,
+                 start=None):
+        """
+        Parameters
+        ----------
+        buffer :: CircularBuffer
+            buffer to follow
+        directory :: string
+            directory of the segments, created if it does not exist
+        segment_bytes :: integer
+            maximum size of the data in one segment
+        chunk_bytes :: integer
+            maximum size of one write
+        prefix :: string
+            prefix of the segment names
+        interval :: float
+            how often the loop looks for new points, in seconds
+        start :: integer
+            global index of the first point to write, defaults to the next
+            point appended to the buffer
+        """
+        from os import makedirs
+        makedirs(directory, exist_ok=True)
+        self.buffer = buffer
+        self.directory = directory
+        self.prefix = prefix
+        self.interval = interval
+        row_bytes = max(1, buffer.buffer[0].nbytes)
+        self.segment_rows = max(1, segment_bytes // row_bytes)
+        self.chunk_rows = max(1, chunk_bytes // row_bytes)
+        self.g_pointer = buffer.g_pointer if start is None else start - 1
+        self.lost = 0
+        self.file = None
+        self.rows = 0  # points in the open segment
+        self.header = 0  # header bytes of the open segment
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """
+        starts the writer loop in a daemon thread.
+        """
+        from threading import Thread
+        self.running = True
+        self.thread = Thread(target=self.run, name='archive', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        stops the writer loop, writes the remaining points and closes the
+        open segment.
+        """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+        self.close()
+
+    def run(self):
+        """
+        the writer loop: writes the new points and waits interval seconds
+        when there are none, until stopped.
+        """
+        from time import sleep
+        while self.running:
+            try:
+                n = self.flush()
+            except Exception as err:
+                error('the archive stopped: {!r}'.format(err))
+                break
+            if n == 0:
+                sleep(self.interval)
+        self.running = False
+
+    def flush(self):
+        """
+        writes all points appended to the buffer since the last call.
+
+        Returns
+        -------
+        n :: integer
+            number of points written
+        """
+        total = 0
+        while True:
+            last = self.buffer.g_pointer
+            oldest = last - self.buffer.length + 1
+            if self.g_pointer + 1 < oldest:
+                warning('{} points were overwritten before they were written'.format(oldest - self.g_pointer - 1))
+                self.lost += oldest - self.g_pointer - 1
+                self.close()
+                self.g_pointer = oldest - 1
+            n = min(last - self.g_pointer, self.chunk_rows)
+            if n <= 0:
+                return total
+            if self.file is None:
+                self._open()
+            n = min(n, self.segment_rows - self.rows)
+            if not self._write(self.g_pointer + 1, n):
+                continue
+            self.g_pointer += n
+            self.rows += n
+            total += n
+            if self.rows == self.segment_rows:
+                self.close()
+
+    def _write(self, start, n):
+        """
+        writes n points starting at global index start from the memory of
+        the buffer, one write per ring segment. Returns False and takes the
+        points back out of the segment if the writer of the buffer overwrote
+        some of them during the copy, flush then counts them as lost.
+        """
+        from .persist import write_from
+        buffer = self.buffer
+        position = self.file.tell()
+        for slc in buffer._slices(start % buffer.length, n):
+            write_from(self.file, buffer.buffer[slc])
+        if buffer.g_pointer - buffer.length + 1 > start:
+            # the writer lapped the archive while the points were written.
+            self.file.seek(position)
+            self.file.truncate()
+            return False
+        return True
+
+    def _header(self, rows):
+        """
+        returns the .npy header of a segment with the given number of points.
+        """
+        from .persist import header
+        return header(self.buffer.dtype, (rows,) + tuple(self.buffer.data_shape))
+
+    def _open(self):
+        """
+        starts a new segment. The header is written for the maximum number
+        of points and rewritten when the segment is closed.
+        """
+        from os.path import join
+        name = '{}_{:015d}.npy'.format(self.prefix, self.g_pointer + 1)
+        self.path = join(self.directory, name)
+        self.file = open(self.path, 'wb')
+        header = self._header(self.segment_rows)
+        self.file.write(header)
+        self.header = len(header)
+        self.rows = 0
+        debug('opened {}'.format(self.path))
+
+    def close(self):
+        """
+        closes the open segment with the number of points it has, an empty
+        segment is deleted.
+        """
+        from os import remove
+        if self.file is None:
+            return
+        if self.rows == 0:
+            self.file.close()
+            self.file = None
+            remove(self.path)
+            return
+        header = self._header(self.rows)
+        if len(header) != self.header:
+            raise Exception('the header of {} changed size'.format(self.path))
+        self.file.seek(0)
+        self.file.write(header)
+        self.file.close()
+        self.file = None
+        debug('closed {} with {} points'.format(self.path, self.rows))
+
+    @property
+    def lag(self):
+        """
+        integer: number of points appended to the buffer but not written yet
+        """
+        return self.buffer.g_pointer - self.g_pointer
@@ -0,0 +1,234 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""Bit buffer
+    by Valentyn Stadnytskyi
+    created: October, 2026
+A circular buffer for digital lines that stores one bit per sample and line
+instead of one byte (dtype='bool'). Every line is a ring of bits packed
+along the time axis in the numpy.packbits layout (first sample in the most
+significant bit), so edges are counted and found on the packed bytes.
+"""
+
+import logging
+from logging import debug, info, warn, error
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+from numpy import array as _array
+POPCOUNT = _array([bin(i).count('1') for i in range(256)], dtype='uint8')  # set bits of every byte
+
+
+class BitBuffer(object):
+    """
+    circular buffer of samples of digital lines, packed into bits.
+
+    :ivar buffer: lines x length/8 packed bytes
+    :ivar pointer: circular index of the last sample, initial value: -1
+    :ivar g_pointer: global index of the last sample, initial value: -1
+
+    Examples
+    --------
+    >>> buffer = BitBuffer(length = 2**24, lines = 64)
+    >>> buffer.append(samples)  # n x 64 booleans
+    >>> buffer.count_edges(10**6, kind = 'rising')
+    """
+    def __init__(self, length=2**16, lines=8):
+        from numpy import zeros
+        if length % 8:
+            raise Exception('the length of a bit buffer has to be a multiple of 8, got {}'.format(length))
+        self.buffer = zeros((lines, length // 8), dtype='uint8')
+        self.pointer = -1
+        self.g_pointer = -1
+
+    def append(self, data):
+        """
+        appends a block of samples.
+
+        Parameters
+        ----------
+        data :: (numpy array)
+            n x lines booleans, or one sample of lines booleans
+
+        Returns
+        -------
+        """
+        from numpy import asarray, unpackbits, packbits
+        data = asarray(data, dtype=bool).reshape(-1, self.lines)
+        n = data.shape[0]
+        if n > self.length:
+            # only the last length samples survive
+            self.g_pointer += n - self.length
+            self.pointer = self.g_pointer % self.length
+            data = data[n - self.length:]
+            n = self.length
+        bits = data.T
+        i = 0
+        for slc in self._slices((self.pointer + 1) % self.length, n):
+            first, last = slc.start // 8, (slc.stop + 7) // 8
+            old = unpackbits(self.buffer[:, first:last], axis=1)
+            old[:, slc.start - 8*first:slc.stop - 8*first] = bits[:, i:i + slc.stop - slc.start]
+            self.buffer[:, first:last] = packbits(old, axis=1)
+            i += slc.stop - slc.start
+        self.pointer = (self.pointer + n) % self.length
+        self.g_pointer += n
+
+    def _window(self, N, M=None):
+        """
+        returns the packed bytes that hold N samples before global index M
+        (including M) and the bit offset of the first sample in them.
+        """
+        from numpy import concatenate
+        if M is None:
+            M = self.g_pointer
+        if N <= 0 or M > self.g_pointer or M - N + 1 < max(0, self.g_pointer - self.length + 1):
+            raise Exception('samples {} to {} are not in the buffer'.format(M - N + 1, M))
+        start = (M - N + 1) % self.length
+        first = start // 8
+        last = first + (start % 8 + N + 7) // 8
+        nbytes = self.buffer.shape[1]
+        if last <= nbytes:
+            return self.buffer[:, first:last], start % 8
+        # the length is a multiple of 8, the bytes continue at the beginning.
+        return concatenate((self.buffer[:, first:], self.buffer[:, :last - nbytes]), axis=1), start % 8
+
+    def get_N_global(self, N, M=None, packed=False):
+        """
+        returns N samples before global index M (including M).
+
+        Parameters
+        ----------
+        N : integer
+            number of samples
+        M : integer
+            global index of the last sample, defaults to g_pointer
+        packed : boolean
+            if True, returns lines x ceil(N/8) packed bytes (numpy.packbits
+            along the time axis) instead of N x lines booleans
+
+        Returns
+        -------
+        array :: (numpy array)
+        """
+        from numpy import unpackbits, packbits, uint8
+        N = int(N)
+        window, offset = self._window(N, M)
+        if packed and offset == 0:
+            result = window[:, :(N + 7) // 8].copy()
+            if N % 8:
+                result[:, -1] &= uint8(0xff << (8 - N % 8) & 0xff)
+            return result
+        bits = unpackbits(window, axis=1)[:, offset:offset + N]
+        if packed:
+            return packbits(bits, axis=1)
+        return bits.T.astype(bool)
+
+    def get_last_N(self, N, packed=False):
+        """
+        returns the last N samples, see get_N_global.
+        """
+        return self.get_N_global(N, self.g_pointer, packed)
+
+    def _transitions(self, N, M, kind):
+        """
+        returns packed bytes with a bit set where a sample differs from the
+        next one in the requested direction, with the offset of the first
+        sample. Only transitions between two of the N samples are set.
+        """
+        from numpy import zeros, concatenate, packbits
+        window, offset = self._window(N, M)
+        following = concatenate((window[:, 1:], zeros((window.shape[0], 1), dtype='uint8')), axis=1)
+        # bit j of shifted is the sample after bit j of window
+        shifted = (window << 1) | (following >> 7)
+        if kind == 'rising':
+            transitions = ~window & shifted
+        elif kind == 'falling':
+            transitions = window & ~shifted
+        elif kind == 'both':
+            transitions = window ^ shifted
+        else:
+            raise Exception("kind has to be 'rising', 'falling' or 'both', got {}".format(kind))
+        mask = zeros(window.shape[1] * 8, dtype=bool)
+        mask[offset:offset + N - 1] = True
+        return transitions & packbits(mask), offset
+
+    def count_edges(self, N, M=None, kind='both'):
+        """
+        counts the edges of every line within N samples before global index M
+        (including M), on the packed bytes.
+
+        Parameters
+        ----------
+        N : integer
+            number of samples
+        M : integer
+            global index of the last sample, defaults to g_pointer
+        kind : string
+            'rising', 'falling' or 'both'
+
+        Returns
+        -------
+        counts :: (numpy array)
+            number of edges of every line
+
+        Examples
+        --------
+        >>> buffer.count_edges(10**6, kind = 'rising')
+        """
+        transitions, offset = self._transitions(N, M, kind)
+        return POPCOUNT[transitions].sum(axis=1, dtype='int64')
+
+    def find_edges(self, line, N, M=None, kind='both'):
+        """
+        returns the global indices of the samples right after the edges of a
+        line within N samples before global index M (including M). Only the
+        bytes with an edge are unpacked.
+
+        Parameters
+        ----------
+        line : integer
+            index of the line
+        N : integer
+            number of samples
+        M : integer
+            global index of the last sample, defaults to g_pointer
+        kind : string
+            'rising', 'falling' or 'both'
+
+        Returns
+        -------
+        indices :: (numpy array)
+
+        Examples
+        --------
+        >>> buffer.find_edges(3, 10**6, kind = 'falling')
+        """
+        from numpy import flatnonzero, unpackbits
+        if M is None:
+            M = self.g_pointer
+        transitions, offset = self._transitions(N, M, kind)
+        row = transitions[line]
+        nonzero = flatnonzero(row)
+        rows, columns = unpackbits(row[nonzero][:, None], axis=1).nonzero()
+        return (M - N + 1) + nonzero[rows] * 8 + columns - offset + 1
+
+    def _slices(self, start, n):
+        """
+        returns one or two slices that cover n samples starting at circular index start.
+        """
+        stop = start + n
+        if stop <= self.length:
+            return [slice(start, stop)]
+        return [slice(start, self.length), slice(0, stop - self.length)]
+
+    @property
+    def length(self):
+        """
+        integer: number of samples in the ring
+        """
+        return self.buffer.shape[1] * 8
+
+    @property
+    def lines(self):
+        """
+        integer: number of lines
+        """
+        return self.buffer.shape[0]
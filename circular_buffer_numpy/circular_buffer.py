@@ -9,6 +9,8 @@ from logging import debug, info, warn, error
 import warnings
 logging.getLogger(__name__).addHandler(logging.NullHandler())
 
+DEADBAND_WINDOW = 256  # points compared at once with the last stored point
+
 class CircularBuffer(object):
     """
     :ivar pointer: initial value: -1
@@ -18,8 +20,10 @@ class CircularBuffer(object):
     pointer = -1 # running current pointer value
     g_pointer = -1 # running current global_pointer value
 
-    def __init__(self, shape=(100, 2), dtype='float64', packet_length=1):
+    def __init__(self, shape=(100, 2), dtype='float64', packet_length=1, lease_policy='block', cache=False, ttl=None,
+                 validity=False, threads=1, allocation=None, deadband=None, deadband_relative=None):
         from numpy import nan, zeros, empty
+        from threading import Condition
         """
         initializes the class. creates an empty numpy array with given size and give dtype.
         the shape follows numpy definition where the first index corresponds to x or col and second is y or row.
@@ -35,18 +39,70 @@ class CircularBuffer(object):
         g_pointer
         packet_pointer
         g_packet_pointer
+        lease_policy - what append does instead of overwriting points pinned
+        by a reader lease: 'block', 'drop' or 'spill'
+        sequence - sequence counter of the writer, odd while a write is in
+        progress (see get_last_N_consistent)
+        cache - if True, get_all and get_data return read-only ordered
+        snapshots that are reused until the next append (g_pointer changes)
+        ttl - time to live in seconds: if given, get_data and valid_length
+        leave out the points appended more than ttl seconds ago
+        validity - if True, a bitmap with one bit per point tells which points
+        are valid (see get_valid), the buffer is not filled with nan
+        threads - number of threads that fill the buffer in reset(clear=True)
+        and change_length
+        allocation - dictionary with the options align, hugepages, prefault
+        and lock of memory.allocate, for example {'align': 64, 'hugepages': True}
+        deadband, deadband_relative - if one is given, append stores a point
+        only if a channel moved by more than deadband and more than
+        deadband_relative times its last stored value (scalars or one value
+        per channel). indices keeps the input index of every stored point,
+        see get_step_series.
         """
         self.__info__ = "Server RingBuffer"
         self.name = 'circular buffer server'
         self.type = 'server'
         self.packet_length = packet_length
-
-        self.buffer = empty(shape, dtype=dtype)
+        self._scratch = None  # partial point assembled by append_from
+        self._scratch_filled = 0
+
+        self.lease_policy = lease_policy
+        self.leases = []  # outstanding reader leases
+        self.lease_condition = Condition()
+        self.spill = []  # blocks diverted by the 'spill' policy, oldest first
+        self.dropped = 0  # number of points discarded by the 'drop' policy
+        self.lease_stats = {'count': 0, 'total_time': 0.0, 'max_time': 0.0}
+        self.sequence = 0
+        self.cache = cache
+        self._cache = {}  # ordered snapshots for g_pointer _cache_g
+        self._cache_g = None
+        self.snapshots = []  # weak references to the live copy-on-write snapshots
+
+        self.threads = threads
+        self.allocation = allocation or {}
+        if self.allocation:
+            from .memory import allocate
+            self.buffer = allocate(shape, dtype, None, threads, **self.allocation)
+        else:
+            # not filled, the memory is mapped when it is written for the first time.
+            self.buffer = empty(shape, dtype=dtype)
+        self.ttl = ttl
+        # append time of every point (monotonic clock), only with ttl
+        self.timestamps = None if ttl is None else zeros(shape[0])
+        # validity bitmap, bit i % 8 of byte i // 8 is set if point i is valid
+        self.valid = zeros(-(-shape[0] // 8), dtype='uint8') if validity else None
+        self.deadband = deadband
+        self.deadband_relative = deadband_relative
+        self.g_input = -1  # input index of the last point offered to the buffer
+        self._reference = None  # last stored point, the deadband is measured from it
+        # input index of every point, only with a deadband
+        deadbanded = deadband is not None or deadband_relative is not None
+        self.indices = zeros(shape[0], dtype='int64') if deadbanded else None
 
         if self.length%self.packet_length != 0:
                 warnings.warn('The number of packets that can fit into this buffer is not integer. The all functions related to manipulation with packets are not going to work properly.', DeprecationWarning, stacklevel=2)
 
-    def append(self, data):
+    def append(self, data, valid=True):
         """
         appends data to the existing circular buffer.
 
@@ -54,6 +110,9 @@ class CircularBuffer(object):
         ----------
         data :: (numpy array)
             data to append
+        valid :: boolean or array of booleans
+            marks all or each of the appended points as valid or as a gap in
+            the validity bitmap.
 
         Returns
         -------
@@ -67,14 +126,670 @@ class CircularBuffer(object):
         >>> buffer.pointer
         5
         """
+        from numpy import ndim
         if len(data.shape) == len(self.shape)-1:
-            data = data.reshape((1,data.shape[0]))
-        for i in range(data.shape[0]):
-            if self.pointer == self.shape[0]-1:
-                self.pointer = -1
-            self.buffer[self.pointer+1] = data[i]
-            self.pointer += 1
-            self.g_pointer += 1
+            data = data.reshape((1,)+data.shape)
+        with self.lease_condition:
+            indices = None
+            if self.indices is not None:
+                mask = self._deadband_mask(data)
+                indices = self.g_input + 1 + mask.nonzero()[0]
+                self.g_input += data.shape[0]
+                data = data[mask]
+                if ndim(valid):
+                    valid = valid[mask]
+            n = data.shape[0]
+            if self.spill or self._pinned(n):
+                if self.lease_policy == 'drop':
+                    self.dropped += n
+                    return
+                elif self.lease_policy == 'spill':
+                    # keep the order: once spilling, everything goes to the spill area.
+                    self.spill.append((data.copy(), valid, indices))
+                    return
+                while self._pinned(n):
+                    self.lease_condition.wait()
+            self._write(data, valid, indices)
+
+    def _deadband_mask(self, data):
+        """
+        returns which points of data move beyond the deadband from the last
+        stored point. Every step compares the next DEADBAND_WINDOW points at
+        once and stores the first one that moved, or moves on to the next
+        window, so every offered point is compared about once plus one
+        window per stored point.
+        """
+        from numpy import zeros, abs, maximum, isnan, argmax
+        n = data.shape[0]
+        mask = zeros(n, dtype=bool)
+        points = data.reshape(n, -1)
+        absolute = 0 if self.deadband is None else self._channels(self.deadband)
+        relative = 0 if self.deadband_relative is None else self._channels(self.deadband_relative)
+        reference = self._reference
+        i = 0
+        while i < n:
+            if reference is None:
+                j = i
+            else:
+                window = points[i:i + DEADBAND_WINDOW]
+                threshold = maximum(absolute, relative * abs(reference))
+                moved = (abs(window - reference) > threshold) | (isnan(window) != isnan(reference))
+                moved = moved.any(axis=1)
+                if not moved.any():
+                    i += window.shape[0]
+                    continue
+                j = i + argmax(moved)
+            mask[j] = True
+            reference = points[j]
+            i = j + 1
+        if reference is not None:
+            self._reference = reference.copy()
+        return mask
+
+    def _channels(self, value):
+        """
+        returns a scalar or per-channel value as one value per flattened channel.
+        """
+        from numpy import broadcast_to, asarray
+        return broadcast_to(asarray(value, dtype='float64'), self.data_shape).reshape(-1)
+
+    def _write(self, data, valid=True, indices=None):
+        """
+        writes data into the buffer, the caller has checked the leases.
+        """
+        from numpy import ndim
+        n = data.shape[0]
+        # one write for the skip and the points, readers see no state in between.
+        self._begin_write()
+        if n > self.length:
+            # only the last length points survive, the rest is skipped.
+            self._advance(n - self.length, True, None if indices is None else indices[:n - self.length])
+            data = data[n - self.length:]
+            if ndim(valid):
+                valid = valid[n - self.length:]
+            if indices is not None:
+                indices = indices[n - self.length:]
+            n = self.length
+        i = 0
+        for segment in self._reserve(n):
+            segment[...] = data[i:i+segment.shape[0]]
+            i += segment.shape[0]
+        self.commit(n, valid, indices)
+
+    def reserve(self, n):
+        """
+        returns writable views of the next n slots in the circular buffer.
+        The producer writes data directly into the views and publishes them
+        with commit(n). The slots wrap around the end of the buffer, in which
+        case two views are returned. While points spilled by the spill policy
+        wait to be written, reserve raises an Exception to keep the order.
+
+        Parameters
+        ----------
+        n :: integer
+            number of points to reserve
+
+        Returns
+        -------
+        segments :: list
+            one or two numpy arrays (views of the buffer) with n points in total
+
+        Examples
+        --------
+        >>> buffer = circular_buffer_numpy.circular_buffer.CircularBuffer(shape = (10,4))
+        >>> for segment in buffer.reserve(6):
+        ...     segment[:] = 1.0
+        >>> buffer.commit(6)
+        >>> buffer.pointer
+        5
+        """
+        with self.lease_condition:
+            if self.spill:
+                raise Exception('cannot reserve {} points, {} blocks are spilled and have to be written first'.format(
+                    n, len(self.spill)))
+        return self._reserve(n)
+
+    def _reserve(self, n):
+        """
+        returns the next n slots, see reserve. The spilled points are not
+        checked, _write uses it to write them back.
+        """
+        if n > self.length:
+            raise Exception('cannot reserve {} points in a buffer of length {}'.format(n, self.length))
+        with self.lease_condition:
+            if self._pinned(n):
+                if self.lease_policy != 'block':
+                    raise Exception('cannot reserve {} points, they are pinned by a reader lease'.format(n))
+                while self._pinned(n):
+                    self.lease_condition.wait()
+        self._begin_write()
+        start = (self.pointer + 1) % self.length
+        if self.snapshots:
+            self._save_segments(start, n)
+        return [self.buffer[slc] for slc in self._slices(start, n)]
+
+    def commit(self, n, valid=True, indices=None):
+        """
+        publishes n points written into the slots returned by reserve(n)
+        by advancing pointer and g_pointer.
+
+        Parameters
+        ----------
+        n :: integer
+            number of points to publish
+        valid :: boolean or array of booleans
+            marks all or each of the n points as valid or as a gap in the
+            validity bitmap
+        indices :: array of integers
+            input indices of the n points if the buffer has a deadband,
+            by default the points follow the last input index
+
+        Returns
+        -------
+
+        Examples
+        --------
+        >>> buffer.commit(6)
+        """
+        self._advance(n, valid, indices)
+        # the sequence becomes even and always changes, readers that copied
+        # points while the pointers moved have to retry.
+        self.sequence += 1 if self.sequence % 2 else 2
+
+    def _advance(self, n, valid=True, indices=None):
+        """
+        advances pointer and g_pointer by n points and records their
+        timestamps, validity and input indices, see commit. The sequence
+        counter is not changed.
+        """
+        if n > 0:
+            if self.timestamps is not None:
+                from time import monotonic
+                now = monotonic()
+                start = (self.pointer + 1 + max(0, n - self.length)) % self.length
+                for slc in self._slices(start, min(n, self.length)):
+                    self.timestamps[slc] = now
+            if self.valid is not None:
+                from numpy import ndim
+                start = (self.pointer + 1 + max(0, n - self.length)) % self.length
+                if ndim(valid):
+                    valid = valid[-min(n, self.length):]
+                self._set_valid(start, min(n, self.length), valid)
+            if self.indices is not None:
+                from numpy import arange
+                if indices is None:
+                    indices = self.g_input + 1 + arange(n)
+                self.g_input = max(self.g_input, int(indices[-1]))
+                start = (self.pointer + 1 + max(0, n - self.length)) % self.length
+                i = max(0, n - self.length)
+                for slc in self._slices(start, min(n, self.length)):
+                    self.indices[slc] = indices[i:i + slc.stop - slc.start]
+                    i += slc.stop - slc.start
+            self.pointer = (self.pointer + n) % self.length
+            self.g_pointer += n
+
+    def _begin_write(self):
+        """
+        makes the sequence counter odd: a write into the buffer is in progress.
+        """
+        if self.sequence % 2 == 0:
+            self.sequence += 1
+
+    def append_from(self, source, nrows):
+        """
+        reads nrows points of raw data from a file-like object (readinto) or
+        a socket (recv_into, recvmsg_into) directly into the circular buffer,
+        without intermediate arrays. The read is split at the end of the
+        buffer and pointer and g_pointer advance after every read. The raw
+        data has to match dtype and data_shape of the buffer.
+
+        Only complete points are read into the buffer, so a short read or the
+        end of the stream never touches points that are still in the buffer.
+        A point that arrives in pieces over a stream socket is assembled in a
+        scratch point first and kept there between calls, for example after
+        a socket timeout. A datagram socket receives one datagram per call,
+        nrows is the largest number of points taken from it and bytes that do
+        not form a complete point are discarded.
+
+        Points that the drop and spill policies would divert are read through
+        a temporary array and passed to append, which drops or spills them.
+
+        Parameters
+        ----------
+        source :: file-like object or socket
+            object with readinto or recv_into method
+        nrows :: integer
+            number of points to read
+
+        Returns
+        -------
+        n :: integer
+            number of points appended. For files and stream sockets it is
+            smaller than nrows only if the source reached the end of the stream.
+
+        Examples
+        --------
+        >>> buffer = CircularBuffer(shape = (1000,4), dtype = '<i2')
+        >>> with open('frames.raw', 'rb') as f:
+        ...     buffer.append_from(f, 100)
+        100
+        """
+        from socket import socket, SOCK_DGRAM
+        if isinstance(source, socket) and source.type == SOCK_DGRAM:
+            return self._append_datagram(source, nrows)
+        return self._append_stream(source, nrows)
+
+    def _diverted(self, n):
+        """
+        returns True if the drop or spill policy diverts the next n points
+        instead of writing them into the buffer.
+        """
+        with self.lease_condition:
+            return self.lease_policy != 'block' and bool(self.spill or self._pinned(n))
+
+    def _append_stream(self, source, nrows):
+        """
+        appends nrows points from a file-like object or a stream socket.
+        """
+        from socket import socket
+        from numpy import frombuffer
+        read = getattr(source, 'readinto', None) or getattr(source, 'recv_into')
+        row_bytes = self.buffer[0].nbytes
+        if self._scratch is None or len(self._scratch) != row_bytes:
+            self._scratch = memoryview(bytearray(row_bytes))
+            self._scratch_filled = 0
+        appended = 0
+        while appended < nrows:
+            if not self._scratch_filled:
+                available = self._available(source)
+                if available is None or not self.buffer.flags.c_contiguous or self._diverted(nrows - appended):
+                    # unknown source, padded rows or diverted points, read through a temporary array.
+                    data = bytearray((nrows - appended) * row_bytes)
+                    view = memoryview(data)
+                    filled = 0
+                    while filled < len(data):
+                        k = read(view[filled:])
+                        if not k:
+                            break
+                        filled += k
+                    n = filled // row_bytes
+                    if n:
+                        points = frombuffer(data, dtype=self.dtype, count=n*self.buffer[0].size)
+                        self.append(points.reshape((n,)+self.data_shape))
+                    return appended + n
+                whole = min(nrows - appended, available // row_bytes)
+                if whole:
+                    # the bytes are already available, the reads return them in full.
+                    for segment in self.reserve(whole):
+                        self._begin_write()
+                        view = memoryview(segment).cast('B')
+                        filled = 0
+                        while filled < view.nbytes:
+                            k = read(view[filled:])
+                            if not k:
+                                break
+                            filled += k
+                        self.commit(filled // row_bytes)
+                        appended += filled // row_bytes
+                        if filled < view.nbytes:
+                            return appended
+                    continue
+                if not isinstance(source, socket):
+                    # end of the file, a trailing incomplete point is not read.
+                    return appended
+            # less than one point is available, assemble it in the scratch point.
+            k = read(self._scratch[self._scratch_filled:])
+            if not k:
+                self._scratch_filled = 0
+                return appended
+            self._scratch_filled += k
+            if self._scratch_filled == row_bytes:
+                point = frombuffer(self._scratch, dtype=self.dtype).reshape(self.data_shape)
+                if self._diverted(1):
+                    self.append(point.copy())
+                else:
+                    self.reserve(1)[0][...] = point
+                    self.commit(1)
+                appended += 1
+                self._scratch_filled = 0
+        return appended
+
+    def _append_datagram(self, source, nrows):
+        """
+        appends up to nrows points from one datagram.
+        """
+        from select import select
+        from socket import timeout
+        size = self._available(source)
+        while not size:
+            ready, _, _ = select([source], [], [], source.gettimeout())
+            if not ready:
+                raise timeout('timed out')
+            size = self._available(source)
+        row_bytes = self.buffer[0].nbytes
+        n = min(nrows, size // row_bytes)
+        if not self.buffer.flags.c_contiguous or self._diverted(n):
+            # padded rows or diverted points, receive into a temporary array.
+            from numpy import frombuffer
+            data = bytearray(size)
+            n = min(n, source.recv_into(data) // row_bytes)
+            if n:
+                points = frombuffer(data, dtype=self.dtype, count=n*self.buffer[0].size)
+                self.append(points.reshape((n,)+self.data_shape))
+            return n
+        buffers = [memoryview(segment).cast('B') for segment in self.reserve(n)] if n else []
+        if size > n * row_bytes:
+            # the rest of the datagram is discarded.
+            buffers.append(bytearray(size - n * row_bytes))
+        received = source.recvmsg_into(buffers)[0]
+        self.commit(min(n, received // row_bytes))
+        return min(n, received // row_bytes)
+
+    def _available(self, source):
+        """
+        returns the number of bytes that can be read from the source without
+        blocking (the size of the next datagram for datagram sockets), or None
+        if it cannot be determined.
+        """
+        from socket import socket
+        if isinstance(source, socket):
+            from fcntl import ioctl
+            from termios import FIONREAD
+            from array import array
+            buf = array('i', [0])
+            ioctl(source.fileno(), FIONREAD, buf)
+            return buf[0]
+        try:
+            if source.seekable():
+                position = source.tell()
+                end = source.seek(0, 2)
+                source.seek(position)
+                return end - position
+        except Exception:
+            pass
+        return None
+
+    def lease(self, N, M=None):
+        """
+        pins N points before global index M (including M) against overwrite
+        and returns them. While the lease is held, append does not overwrite
+        the pinned points; depending on lease_policy it waits for the release
+        ('block'), discards the new data ('drop') or keeps the new data in the
+        spill area and appends it after the release ('spill').
+        A thread that holds a lease must not append with the 'block' policy.
+
+        Parameters
+        ----------
+        N : integer
+            number of points
+        M : integer
+            global index of the last point, defaults to g_pointer
+
+        Returns
+        -------
+        lease : ReadLease
+            lease with the points in lease.data
+
+        Examples
+        --------
+        >>> with buffer.lease(100) as lease:
+        ...     process(lease.data)
+        """
+        from time import monotonic
+        with self.lease_condition:
+            if M is None:
+                M = self.g_pointer
+            if N <= 0 or M > self.g_pointer or M - N + 1 < max(0, self.g_pointer - self.length + 1):
+                raise Exception('points {} to {} are not in the buffer'.format(M - N + 1, M))
+            # views of the stored points, also in subclasses that convert them.
+            lease = ReadLease(self, M - N + 1, M, CircularBuffer.get_N_global(self, N, M), monotonic())
+            self.leases.append(lease)
+        return lease
+
+    def release(self, lease):
+        """
+        releases a reader lease, updates lease_stats and appends the spilled
+        data that is not pinned anymore.
+
+        Parameters
+        ----------
+        lease : ReadLease
+            lease returned by lease()
+
+        Returns
+        -------
+
+        Examples
+        --------
+        >>> buffer.release(lease)
+        """
+        from time import monotonic
+        with self.lease_condition:
+            if lease not in self.leases:
+                raise Exception('lease is not outstanding')
+            self.leases.remove(lease)
+            hold_time = monotonic() - lease.time
+            self.lease_stats['count'] += 1
+            self.lease_stats['total_time'] += hold_time
+            self.lease_stats['max_time'] = max(self.lease_stats['max_time'], hold_time)
+            while self.spill and not self._pinned(self.spill[0][0].shape[0]):
+                self._write(*self.spill.pop(0))
+            self.lease_condition.notify_all()
+
+    def get_valid(self, N, M=None):
+        """
+        returns the validity of N points before global index M (including M)
+        from the validity bitmap, in the order of get_last_N(N) or
+        get_N_global(N, M). The mask selects the valid points for reductions
+        without nan-aware functions.
+
+        Parameters
+        ----------
+        N : integer
+            number of points
+        M : integer
+            global index of the last point, defaults to g_pointer
+
+        Returns
+        -------
+        mask : array of booleans
+
+        Examples
+        --------
+        >>> buffer = CircularBuffer(shape = (1000,4), dtype = 'int16', validity = True)
+        >>> mean = buffer.get_last_N(100)[buffer.get_valid(100)].mean(axis = 0)
+        """
+        from numpy import unpackbits, concatenate
+        if self.valid is None:
+            raise Exception('the buffer has no validity bitmap, use validity=True')
+        if M is None:
+            M = self.g_pointer
+        masks = [unpackbits(self.valid[:0])]
+        for slc in self._slices((M - N + 1) % self.length, N):
+            first = slc.start // 8
+            bits = unpackbits(self.valid[first:(slc.stop + 7) // 8], bitorder='little')
+            masks.append(bits[slc.start - 8*first:slc.stop - 8*first])
+        return concatenate(masks).astype(bool)
+
+    def get_indices(self, N, M=None):
+        """
+        returns the input indices of N stored points before global index M
+        (including M) of a buffer with a deadband, in the order of
+        get_last_N(N) or get_N_global(N, M).
+
+        Parameters
+        ----------
+        N : integer
+            number of points
+        M : integer
+            global index of the last point, defaults to g_pointer
+
+        Returns
+        -------
+        indices : array of integers
+
+        Examples
+        --------
+        >>> buffer.get_indices(10)
+        """
+        from numpy import concatenate
+        if self.indices is None:
+            raise Exception('the buffer has no deadband, every input point is stored')
+        if M is None:
+            M = self.g_pointer
+        slices = self._slices((M - N + 1) % self.length, N)
+        return concatenate([self.indices[:0]] + [self.indices[slc] for slc in slices])
+
+    def get_step_series(self, start, stop):
+        """
+        reconstructs the input points with input indices start to stop
+        (including stop) of a buffer with a deadband: every input point is
+        represented by the last stored point at or before it.
+
+        Parameters
+        ----------
+        start : integer
+            first input index
+        stop : integer
+            last input index
+
+        Returns
+        -------
+        array : array_like
+            stop - start + 1 points
+
+        Examples
+        --------
+        >>> data = buffer.get_step_series(buffer.g_input - 999, buffer.g_input)
+        """
+        from numpy import arange, searchsorted
+        n = min(self.g_pointer + 1, self.length)
+        indices = self.get_indices(n)
+        if n == 0 or start < indices[0] or stop > self.g_input:
+            raise Exception('input points {} to {} cannot be reconstructed'.format(start, stop))
+        positions = searchsorted(indices, arange(start, stop + 1), side='right') - 1
+        return CircularBuffer.get_last_N(self, n)[positions]
+
+    def invalidate(self, N, M=None):
+        """
+        marks N points before global index M (including M) as invalid in the
+        validity bitmap.
+
+        Parameters
+        ----------
+        N : integer
+            number of points
+        M : integer
+            global index of the last point, defaults to g_pointer
+
+        Returns
+        -------
+
+        Examples
+        --------
+        >>> buffer.invalidate(1)
+        """
+        if self.valid is None:
+            raise Exception('the buffer has no validity bitmap, use validity=True')
+        if M is None:
+            M = self.g_pointer
+        if N <= 0 or M > self.g_pointer or M - N + 1 < max(0, self.g_pointer - self.length + 1):
+            raise Exception('points {} to {} are not in the buffer'.format(M - N + 1, M))
+        self._set_valid((M - N + 1) % self.length, N, False)
+
+    def _set_valid(self, start, n, valid):
+        """
+        sets the validity of n points starting at circular index start.
+        """
+        from numpy import unpackbits, packbits, broadcast_to, asarray
+        valid = broadcast_to(asarray(valid, dtype=bool), (n,))
+        i = 0
+        for slc in self._slices(start, n):
+            first = slc.start // 8
+            last = (slc.stop + 7) // 8
+            bits = unpackbits(self.valid[first:last], bitorder='little')
+            bits[slc.start - 8*first:slc.stop - 8*first] = valid[i:i + slc.stop - slc.start]
+            self.valid[first:last] = packbits(bits, bitorder='little')
+            i += slc.stop - slc.start
+
+    def snapshot(self):
+        """
+        returns a frozen point-in-time view of the circular buffer. Taking the
+        snapshot does not copy data. Before the buffer overwrites a segment
+        of snapshot_segment points for the first time, the segment is copied
+        aside for all live snapshots that still need it. A snapshot stops
+        costing copies when it is released or garbage collected.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+        snapshot : Snapshot
+
+        Examples
+        --------
+        >>> snap = buffer.snapshot()
+        >>> buffer.append(data)
+        >>> data_at_fault = snap.get_data()
+        >>> snap.release()
+        """
+        from weakref import ref
+        snapshot = Snapshot(self, self.buffer, self.pointer, self.g_pointer)
+        self.snapshots.append(ref(snapshot))
+        return snapshot
+
+    def _save_segments(self, start, n):
+        """
+        copies the segments that the next n points starting at circular index
+        start overwrite into the snapshots that have not saved them yet.
+        """
+        snapshots = []
+        for reference in self.snapshots:
+            snapshot = reference()
+            if snapshot is not None and snapshot.array is self.buffer \
+                    and len(snapshot.saved) < snapshot.segments:
+                snapshots.append(snapshot)
+        self.snapshots = [ref for ref in self.snapshots if ref() in snapshots]
+        size = self.snapshot_segment
+        for slc in self._slices(start, n):
+            for segment in range(slc.start // size, (slc.stop - 1) // size + 1):
+                copy = None
+                for snapshot in snapshots:
+                    if segment not in snapshot.saved:
+                        if copy is None:
+                            copy = self.buffer[segment*size:(segment+1)*size].copy()
+                        snapshot.saved[segment] = copy
+
+    @property
+    def snapshot_segment(self):
+        """
+        number of points copied at once for snapshots, about 1 MB.
+        """
+        return max(1, min(self.length, 2**20 // max(1, self.buffer[0].nbytes)))
+
+    def _pinned(self, n):
+        """
+        returns True if writing n points would overwrite a point pinned by a lease.
+        """
+        if not self.leases:
+            return False
+        # global indices of the points that the next n points overwrite
+        first = self.g_pointer + 1 - self.length
+        last = self.g_pointer + n - self.length
+        for lease in self.leases:
+            if lease.start <= last and lease.stop >= first:
+                return True
+        return False
+
+    def _slices(self, start, n):
+        """
+        returns one or two slices that cover n points starting at circular index start.
+        """
+        stop = start + n
+        if stop <= self.length:
+            return [slice(start, stop)]
+        return [slice(start, self.length), slice(0, stop - self.length)]
 
     def reset(self, clear=False):
         """
@@ -93,19 +808,28 @@ class CircularBuffer(object):
         --------
         >>> circual_buffer.CircularBuffer.reset()
         """
-        from numpy import nan
-        if clear:
-            if 'float' in self.type:
-                self.buffer = self.buffer * nan
-            else:
-                self.buffer = self.buffer*0
+        from .memory import fill_array, missing_value
+        if clear and self.valid is not None:
+            # no point is valid, the data stays.
+            self.valid[:] = 0
+        elif clear:
+            # in place, without a temporary copy of the buffer.
+            if self.snapshots:
+                self._save_segments(0, self.length)
+            fill_array(self.buffer, missing_value(self.dtype), self.threads)
         self.pointer = -1
         self.g_pointer = -1
+        self.spill = []
+        self._cache_g = None
+        self.g_input = -1
+        self._reference = None
         debug('{},{}'.format(self.pointer, self.g_pointer))
 
     def change_length(self, length):
         """
-        changes length of the buffer
+        changes length of the buffer. The last points are kept with their
+        global indices, the points that the longer buffer has no data for are
+        filled with nan (or zeros) and are invalid in the validity bitmap.
 
         Parameters
         ----------
@@ -124,11 +848,113 @@ class CircularBuffer(object):
         >>> buffer.shape
         (12,4)
         """
-        from numpy import zeros, nan, copy
-        old_buffer = self.get_all()
-        new_length = [length] + list(data_shape)
-        self.buffer = zeros(shape=new_length, dtype=self.dtype) * nan
-        self.append(old_buffer)
+        from numpy import zeros, array
+        from .memory import allocate, missing_value
+        n = min(self.g_pointer + 1, self.length, length)
+        old_buffer = array(CircularBuffer.get_last_N(self, n))
+        valid = self.get_valid(n) if self.valid is not None else True
+        if self.timestamps is not None:
+            timestamps = self.timestamps[[(self.pointer - i) % self.length for i in range(n-1, -1, -1)]]
+            self.timestamps = zeros(length)
+        if self.valid is not None:
+            self.valid = zeros(-(-length // 8), dtype='uint8')
+        indices = None
+        if self.indices is not None:
+            indices = self.get_indices(n)
+            self.indices = zeros(length, dtype='int64')
+        self.buffer = allocate((length,) + self.data_shape, self.dtype, missing_value(self.dtype),
+                               self.threads, **self.allocation)
+        self._cache_g = None
+        # the points keep their global indices.
+        self.g_pointer -= n
+        self.pointer = self.g_pointer % length if self.g_pointer >= 0 else -1
+        self._write(old_buffer, valid, indices)
+        if self.timestamps is not None and n:
+            self.timestamps[[(self.pointer - i) % length for i in range(n-1, -1, -1)]] = timestamps
+
+    def save(self, path):
+        """
+        saves the points and the state of the buffer: the points oldest first
+        as a .npy file at path, written straight from the ring, the pointers,
+        the validity bitmap, the input indices and the age of the points to
+        path + '.npz'. Appends have to wait until save returns.
+
+        Parameters
+        ----------
+        path :  string
+            path of the .npy file
+
+        Returns
+        -------
+
+        Examples
+        --------
+        >>> buffer.save('/data/buffer.npy')
+        """
+        from numpy import arange
+        from time import time, monotonic
+        from . import persist
+        n = min(self.g_pointer + 1, self.length)
+        start = (self.pointer - n + 1) % self.length
+        state = {'pointer': self.pointer, 'g_pointer': self.g_pointer,
+                 'packet_length': self.packet_length, 'g_input': self.g_input}
+        if self.valid is not None:
+            state['valid'] = CircularBuffer.get_valid(self, n)
+        if self.indices is not None:
+            state['indices'] = CircularBuffer.get_indices(self, n)
+        if self._reference is not None:
+            state['reference'] = self._reference
+        if self.timestamps is not None:
+            state['time'] = time()
+            state['ages'] = monotonic() - self.timestamps[(start + arange(n)) % self.length]
+        segments = [self.buffer[slc] for slc in self._slices(start, n)]
+        persist.save(path, segments, self.dtype, self.data_shape, state)
+
+    def load(self, path):
+        """
+        restores the points and the state saved by save. The points are read
+        straight into the ring and keep their global indices. dtype and
+        data_shape have to match, a shorter buffer keeps the newest points.
+        The time the buffer was saved counts towards the age of the points.
+
+        Parameters
+        ----------
+        path :  string
+            path of the .npy file
+
+        Returns
+        -------
+
+        Examples
+        --------
+        >>> buffer = CircularBuffer(shape = (10**8, 4))
+        >>> buffer.load('/data/buffer.npy')
+        """
+        from numpy import arange
+        from time import time, monotonic
+        from . import persist
+        file, saved, state = persist.open_saved(path, self.dtype, self.data_shape)
+        with file:
+            n = min(saved, self.length)
+            file.seek((saved - n) * self.buffer[0].nbytes, 1)
+            CircularBuffer.reset(self)
+            self.g_pointer = int(state['g_pointer']) - n
+            self.pointer = self.g_pointer % self.length if self.g_pointer >= 0 else -1
+            self.packet_length = int(state['packet_length'])
+            self._begin_write()
+            if self.snapshots:
+                self._save_segments((self.pointer + 1) % self.length, n)
+            slices = self._slices((self.pointer + 1) % self.length, n)
+            persist.read_into(file, [self.buffer[slc] for slc in slices])
+        valid = state['valid'][saved - n:] if 'valid' in state and self.valid is not None else True
+        indices = state['indices'][saved - n:] if 'indices' in state and self.indices is not None else None
+        self.commit(n, valid, indices)
+        self.g_input = int(state['g_input'])
+        if 'reference' in state and self.indices is not None:
+            self._reference = state['reference']
+        if self.timestamps is not None and 'ages' in state and n:
+            ages = state['ages'][saved - n:] + max(0.0, time() - float(state['time']))
+            self.timestamps[(self.pointer - n + 1 + arange(n)) % self.length] = monotonic() - ages
 
     def get_all(self):
         """
@@ -147,7 +973,7 @@ class CircularBuffer(object):
         --------
         >>> data = circual_buffer.CircularBuffer.get_all()
         """
-        return self.get_last_N(N=self.shape[0])
+        return self._memoized(self.get_last_N, self.shape[0])
 
     def get_data(self):
         """
@@ -167,11 +993,31 @@ class CircularBuffer(object):
         --------
         >>> data = circual_buffer.CircularBuffer.get_data()
         """
+        if self.ttl is not None:
+            return self._memoized(self.get_last_N, self.valid_length)
         if self.g_pointer + 1 < self.length:
-            return self.get_last_N(self.g_pointer+1)
+            return self._memoized(self.get_last_N, self.g_pointer+1)
         else:
             return self.get_all()
 
+    def _memoized(self, getter, *args):
+        """
+        returns getter(*args), with cache=True as a read-only copy that is
+        kept until g_pointer changes.
+        """
+        from numpy import array
+        if not self.cache:
+            return getter(*args)
+        if self._cache_g != self.g_pointer:
+            self._cache = {}
+            self._cache_g = self.g_pointer
+        key = (getter.__name__,) + args
+        if key not in self._cache:
+            result = array(getter(*args), copy=True)
+            result.flags.writeable = False
+            self._cache[key] = result
+        return self._cache[key]
+
     def get_last_N(self, N):
         """
         returns last N entries from the known self.pointer(circular buffer pointer)
@@ -197,6 +1043,80 @@ class CircularBuffer(object):
             result = concatenate((self.buffer[-(N-P-1):], self.buffer[:P+1]), axis=0)
         return result
 
+    def get_last_N_consistent(self, N, timeout=1.0):
+        """
+        returns a copy of the last N entries that is guaranteed to be
+        consistent when another thread appends at the same time. The read uses
+        the sequence counter of the writer (seqlock): it is retried if a write
+        was in progress or happened while the points were copied, first
+        right away, then with a sleep that doubles up to a millisecond. The
+        writer is never blocked.
+
+        Parameters
+        ----------
+        N : integer
+            number of points to return
+        timeout : float
+            seconds of retrying before giving up
+
+        Returns
+        -------
+        array (numpy array)
+
+        Examples
+        --------
+        >>> data = circual_buffer.CircularBuffer.get_last_N_consistent(10)
+        """
+        return self._read_consistent(self.get_last_N, timeout, N)
+
+    def get_N_global_consistent(self, N=0, M=0, timeout=1.0):
+        """
+        returns a copy of N points before global index M that is guaranteed to
+        be consistent when another thread appends at the same time, see
+        get_last_N_consistent.
+
+        Parameters
+        ----------
+        N : integer
+            number of points to return
+        M : integer
+            global index of the pointer
+        timeout : float
+            seconds of retrying before giving up
+
+        Returns
+        -------
+        array : array_like
+
+        Examples
+        --------
+        >>> data = circual_buffer.CircularBuffer.get_N_global_consistent(N=2, M=5)
+        """
+        return self._read_consistent(self.get_N_global, timeout, N, M)
+
+    def _read_consistent(self, getter, timeout, *args):
+        """
+        calls getter and copies the result until the sequence counter is even
+        and did not change during the call, or timeout seconds have passed.
+        """
+        from numpy import array
+        from time import sleep, monotonic
+        deadline = monotonic() + timeout
+        attempt = 0
+        while True:
+            sequence = self.sequence
+            if sequence % 2 == 0:
+                result = array(getter(*args), copy=True)
+                if self.sequence == sequence:
+                    return result
+            now = monotonic()
+            if now >= deadline:
+                break
+            # a few immediate retries, then a sleep that doubles up to 1 ms.
+            sleep(min(0.0 if attempt < 3 else 1e-6 * 2**min(attempt - 3, 10), 0.001, deadline - now))
+            attempt += 1
+        raise Exception('could not get a consistent read in {} seconds'.format(timeout))
+
     def get_last_value(self):
         """
         returns last entry from the known. Same as self.buffer[self.pointer]
@@ -424,6 +1344,28 @@ class CircularBuffer(object):
         return self.buffer.shape[0]
     length = property(get_length)
 
+    @property
+    def valid_length(self):
+        """
+        integer: number of valid points, the points appended more than ttl
+        seconds ago are not counted. The timestamps of the points increase in
+        the historic order, the expired points are found by binary search.
+        """
+        from numpy import searchsorted
+        n = min(self.g_pointer + 1, self.length)
+        if self.ttl is None or n == 0:
+            return n
+        from time import monotonic
+        cutoff = monotonic() - self.ttl
+        expired = 0
+        for slc in self._slices((self.pointer - n + 1) % self.length, n):
+            segment = self.timestamps[slc]
+            k = searchsorted(segment, cutoff, side='left')
+            expired += k
+            if k < segment.shape[0]:
+                break
+        return n - expired
+
     @property
     def data_shape(self):
         """
@@ -454,6 +1396,99 @@ class CircularBuffer(object):
         return self.pointer
 
 
+class ReadLease(object):
+    """
+    points of a CircularBuffer pinned against overwrite by CircularBuffer.lease.
+    The lease can be used as a context manager that releases it on exit.
+
+    :ivar data: the pinned points
+    :ivar start: global index of the first pinned point
+    :ivar stop: global index of the last pinned point
+    :ivar time: time when the lease was taken, monotonic clock
+    """
+    def __init__(self, buffer, start, stop, data, time):
+        self.buffer = buffer
+        self.start = start
+        self.stop = stop
+        self.data = data
+        self.time = time
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.buffer.release(self)
+        return False
+
+
+class Snapshot(object):
+    """
+    frozen point-in-time view of a CircularBuffer returned by
+    CircularBuffer.snapshot. The points are read from the buffer, or from
+    the copies of the segments that were overwritten after the snapshot was
+    taken. The snapshot can be used as a context manager that releases it
+    on exit.
+
+    :ivar pointer: circular pointer at the time of the snapshot
+    :ivar g_pointer: global pointer at the time of the snapshot
+    :ivar saved: copies of the overwritten segments by segment index
+    """
+    def __init__(self, buffer, array, pointer, g_pointer):
+        self.buffer = buffer
+        self.array = array
+        self.pointer = pointer
+        self.g_pointer = g_pointer
+        self.size = buffer.snapshot_segment
+        self.segments = -(-array.shape[0] // self.size)
+        self.saved = {}
+
+    def get_last_N(self, N):
+        """
+        returns a copy of the last N points at the time of the snapshot.
+        """
+        from numpy import concatenate
+        length = self.array.shape[0]
+        start = (self.pointer - N + 1) % length
+        if start + N <= length:
+            slices = [slice(start, start + N)]
+        else:
+            slices = [slice(start, length), slice(0, start + N - length)]
+        pieces = [self.array[:0]]
+        for slc in slices:
+            i = slc.start
+            while i < slc.stop:
+                segment = i // self.size
+                stop = min(slc.stop, (segment + 1) * self.size)
+                if segment in self.saved:
+                    offset = segment * self.size
+                    pieces.append(self.saved[segment][i-offset:stop-offset])
+                else:
+                    pieces.append(self.array[i:stop])
+                i = stop
+        return concatenate(pieces, axis=0)
+
+    def get_data(self):
+        """
+        returns a copy of all valid points at the time of the snapshot in
+        the historic order.
+        """
+        return self.get_last_N(min(self.g_pointer + 1, self.array.shape[0]))
+
+    def release(self):
+        """
+        stops saving segments for this snapshot.
+        """
+        self.saved = {}
+        self.segments = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+        return False
+
+
 if __name__ == "__main__":  # for testing purposes
     from pdb import pm  # for debugging
     from time import time
@@ -0,0 +1,311 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""Compressed circular buffer
+    by Valentyn Stadnytskyi
+    created: October, 2026
+A circular buffer for slowly varying channels (temperatures, pressures,
+motor positions) that keeps the points compressed in blocks, in the style of
+Facebook's Gorilla time series database:
+- every value is XORed with the previous value of the same channel. A value
+  that did not change costs one bit, a value that changed costs two header
+  bytes and its meaningful bits (between leading and trailing zeros).
+- optional integer timestamps are stored as delta-of-delta, regular sampling
+  costs one bit per point.
+The memory of the buffer is given in bytes, the oldest blocks are dropped when
+it is exceeded. Reads decode only the blocks they touch.
+"""
+
+import logging
+from logging import debug, info, warn, error
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+BLOCK_OVERHEAD = 64  # bytes counted per block in addition to the encoded arrays
+
+
+def encode(x):
+    """
+    encodes an array of unsigned integers: one flag bit per value tells if it
+    is not zero, non-zero values are stored as two header bytes (leading
+    zeros, number of meaningful bits) and their meaningful bits.
+
+    Parameters
+    ----------
+    x :: (numpy array)
+        1-D array of unsigned integers
+
+    Returns
+    -------
+    flags, headers, payload :: tuple of uint8 numpy arrays
+    """
+    from numpy import packbits, unpackbits, argmax, arange, stack
+    bits = x.dtype.itemsize * 8
+    nonzero = x != 0
+    values = x[nonzero]
+    # bits of the non-zero values, most significant first
+    big_endian = values.astype('>u{}'.format(x.dtype.itemsize)).view('uint8')
+    b = unpackbits(big_endian.reshape(-1, x.dtype.itemsize), axis=1)
+    leading = argmax(b, axis=1)
+    trailing = argmax(b[:, ::-1], axis=1)
+    columns = arange(bits)
+    meaningful = (columns >= leading[:, None]) & (columns < (bits - trailing)[:, None])
+    headers = stack((leading, bits - leading - trailing), axis=1).astype('uint8')
+    return packbits(nonzero), headers, packbits(b[meaningful])
+
+
+def decode(flags, headers, payload, count, dtype):
+    """
+    decodes count unsigned integers of the given dtype encoded by encode.
+    """
+    from numpy import unpackbits, packbits, zeros, repeat, arange, cumsum
+    itemsize = dtype.itemsize
+    bits = itemsize * 8
+    nonzero = unpackbits(flags, count=count).astype(bool)
+    leading = headers[:, 0].astype('int64')
+    lengths = headers[:, 1].astype('int64')
+    total = int(lengths.sum())
+    stream = unpackbits(payload, count=total)
+    starts = repeat(cumsum(lengths) - lengths, lengths)
+    rows = repeat(arange(headers.shape[0]), lengths)
+    b = zeros((headers.shape[0], bits), dtype='uint8')
+    b[rows, repeat(leading, lengths) + arange(total) - starts] = stream
+    x = zeros(count, dtype=dtype)
+    x[nonzero] = packbits(b, axis=1).view('>u{}'.format(itemsize)).reshape(-1)
+    return x
+
+
+class Block(object):
+    """
+    compressed block of points of a CompressedCircularBuffer.
+
+    :ivar start: global index of the first point
+    :ivar length: number of points
+    :ivar values: encoded XOR of the values, channel after channel
+    :ivar timestamps: encoded delta-of-delta of the timestamps or None
+    """
+    def __init__(self, start, length, values, timestamps):
+        self.start = start
+        self.length = length
+        self.values = values
+        self.timestamps = timestamps
+
+    @property
+    def nbytes(self):
+        nbytes = BLOCK_OVERHEAD + sum(array.nbytes for array in self.values)
+        if self.timestamps is not None:
+            nbytes += sum(array.nbytes for array in self.timestamps)
+        return nbytes
+
+
+class CompressedCircularBuffer(object):
+    """
+    circular buffer that stores blocks of block_length points compressed.
+    The newest points are kept uncompressed in the open block until it is
+    full. The buffer keeps as many points as fit into max_bytes, its length
+    depends on how well the data compresses. The values are restored bit for
+    bit, including nan and -0.0.
+
+    :ivar g_pointer: global index of the last point, initial value: -1
+    :ivar blocks: compressed blocks, oldest first
+
+    Examples
+    --------
+    >>> buffer = CompressedCircularBuffer(max_bytes = 2**20, data_shape = (8,))
+    >>> buffer.append(temperatures)
+    >>> data = buffer.get_last_N(1000)
+    """
+    def __init__(self, max_bytes=2**20, data_shape=(1,), dtype='float64', block_length=1024, timestamps=False):
+        from numpy import empty, dtype as numpy_dtype, prod
+        self.max_bytes = max_bytes
+        self.data_shape = tuple(data_shape)
+        self.dtype = numpy_dtype(dtype)
+        if self.dtype.itemsize not in (1, 2, 4, 8):
+            raise Exception('cannot compress {}'.format(self.dtype))
+        self.channels = int(prod(self.data_shape, dtype='int64'))
+        self.block_length = block_length
+        self.blocks = []
+        self.starts = []  # global index of the first point of every block
+        self.nbytes_blocks = 0
+        self.g_pointer = -1
+        self.open = empty((block_length, self.channels), dtype=self.dtype)
+        self.open_timestamps = empty(block_length, dtype='int64') if timestamps else None
+        self.open_length = 0
+        self._decoded = None  # last decoded block and its points
+
+    def append(self, data, timestamps=None):
+        """
+        appends data to the buffer.
+
+        Parameters
+        ----------
+        data :: (numpy array)
+            one point or an array of points
+        timestamps :: (numpy array)
+            integer timestamp of every point, for example in nanoseconds,
+            required if the buffer was created with timestamps=True
+
+        Returns
+        -------
+        """
+        from numpy import asarray
+        data = asarray(data, dtype=self.dtype).reshape(-1, self.channels)
+        if self.open_timestamps is not None:
+            if timestamps is None:
+                raise Exception('the buffer stores timestamps, append needs them')
+            timestamps = asarray(timestamps, dtype='int64').reshape(-1)
+        i = 0
+        while i < data.shape[0]:
+            k = min(data.shape[0] - i, self.block_length - self.open_length)
+            self.open[self.open_length:self.open_length + k] = data[i:i+k]
+            if self.open_timestamps is not None:
+                self.open_timestamps[self.open_length:self.open_length + k] = timestamps[i:i+k]
+            self.open_length += k
+            self.g_pointer += k
+            i += k
+            if self.open_length == self.block_length:
+                self._close()
+
+    def _close(self):
+        """
+        compresses the open block and drops the oldest blocks that do not fit
+        into max_bytes.
+        """
+        from numpy import bitwise_xor, concatenate, diff
+        n = self.open_length
+        values = self.open[:n].view('u{}'.format(self.dtype.itemsize))
+        x = values.copy()
+        x[1:] = bitwise_xor(values[1:], values[:-1])
+        encoded_timestamps = None
+        if self.open_timestamps is not None:
+            t = self.open_timestamps[:n]
+            d = diff(t)
+            e = concatenate((t[:1], d[:1], diff(d)))
+            # zigzag: small negative numbers become small positive numbers
+            encoded_timestamps = encode(((e << 1) ^ (e >> 63)).view('uint64'))
+        block = Block(self.g_pointer - n + 1, n, encode(x.T.reshape(-1)), encoded_timestamps)
+        self.blocks.append(block)
+        self.starts.append(block.start)
+        self.nbytes_blocks += block.nbytes
+        self.open_length = 0
+        while self.blocks and self.nbytes > self.max_bytes:
+            self.nbytes_blocks -= self.blocks.pop(0).nbytes
+            self.starts.pop(0)
+
+    def _decode(self, block):
+        """
+        returns the points and the timestamps (or None) of a block.
+        """
+        from numpy import bitwise_xor, cumsum, concatenate, dtype
+        if self._decoded is not None and self._decoded[0] is block:
+            return self._decoded[1], self._decoded[2]
+        n = block.length
+        x = decode(*block.values, count=n*self.channels, dtype=dtype('u{}'.format(self.dtype.itemsize)))
+        values = bitwise_xor.accumulate(x.reshape(self.channels, n).T, axis=0)
+        data = values.view(self.dtype)
+        timestamps = None
+        if block.timestamps is not None:
+            z = decode(*block.timestamps, count=n, dtype=dtype('uint64'))
+            e = (z >> 1).view('int64') ^ -(z & 1).view('int64')
+            timestamps = e[0] + concatenate(([0], cumsum(cumsum(e[1:]))))[:n]
+        self._decoded = (block, data, timestamps)
+        return data, timestamps
+
+    def get_N_global(self, N=0, M=0, timestamps=False):
+        """
+        returns N points before global index M (including M), decoding only
+        the blocks that contain them.
+
+        Parameters
+        ----------
+        N : integer
+            number of points to return
+        M : integer
+            global index of the last point
+        timestamps : boolean
+            if True, returns the timestamps and the points
+
+        Returns
+        -------
+        array : array_like
+            or tuple (timestamps, array)
+
+        Examples
+        --------
+        >>> data = buffer.get_N_global(N=2, M=5)
+        """
+        from bisect import bisect_right
+        from numpy import concatenate
+        first = M - N + 1
+        if N < 0 or M > self.g_pointer or (N and first < self.first):
+            raise Exception('points {} to {} are not in the buffer'.format(first, M))
+        data_pieces = [self.open[:0]]
+        timestamp_pieces = [self.open[:0, 0].astype('int64')]
+        i = max(0, bisect_right(self.starts, first) - 1)
+        while N and i < len(self.blocks) and self.blocks[i].start <= M:
+            block = self.blocks[i]
+            data, t = self._decode(block)
+            a = max(first, block.start) - block.start
+            b = min(M, block.start + block.length - 1) - block.start + 1
+            data_pieces.append(data[a:b])
+            if t is not None:
+                timestamp_pieces.append(t[a:b])
+            i += 1
+        open_start = self.g_pointer - self.open_length + 1
+        if N and M >= open_start:
+            a = max(first, open_start) - open_start
+            b = M - open_start + 1
+            data_pieces.append(self.open[a:b])
+            if self.open_timestamps is not None:
+                timestamp_pieces.append(self.open_timestamps[a:b])
+        data = concatenate(data_pieces).reshape((-1,) + self.data_shape)
+        if timestamps:
+            return concatenate(timestamp_pieces), data
+        return data
+
+    def get_last_N(self, N, timestamps=False):
+        """
+        returns the last N points, see get_N_global.
+        """
+        return self.get_N_global(N, self.g_pointer, timestamps)
+
+    def get_data(self, timestamps=False):
+        """
+        returns all points in the buffer in the historic order, see get_N_global.
+        """
+        return self.get_last_N(self.length, timestamps)
+
+    @property
+    def first(self):
+        """
+        integer: global index of the oldest point in the buffer
+        """
+        if self.blocks:
+            return self.blocks[0].start
+        return self.g_pointer - self.open_length + 1
+
+    @property
+    def length(self):
+        """
+        integer: number of points in the buffer
+        """
+        return self.g_pointer + 1 - self.first
+
+    @property
+    def nbytes(self):
+        """
+        integer: memory used by the points, compressed blocks and open block
+        """
+        nbytes = self.nbytes_blocks + self.open.nbytes
+        if self.open_timestamps is not None:
+            nbytes += self.open_timestamps.nbytes
+        return nbytes
+
+    @property
+    def ratio(self):
+        """
+        float: compression ratio of the compressed blocks
+        """
+        points = sum(block.length for block in self.blocks)
+        raw = points * self.channels * self.dtype.itemsize
+        if self.open_timestamps is not None:
+            raw += points * 8
+        return raw / max(1, self.nbytes_blocks)
@@ -0,0 +1,97 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""Ingest
+    by Valentyn Stadnytskyi
+    created: October, 2026
+Background loop that streams raw frames from a socket (UDP or TCP) or a file
+straight into a circular buffer with CircularBuffer.append_from.
+The frames are written directly into the memory of the buffer, no temporary
+arrays are created on the way.
+"""
+
+import logging
+from logging import debug, info, warn, error
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+
+class Ingest(object):
+    """
+    reads frames from a source into a circular buffer in a background thread.
+
+    :ivar count: number of points appended since start
+    :ivar running: True while the loop is running
+    """
+    def __init__(self, buffer, source, nrows=1, timeout=0.1):
+        """
+        Parameters
+        ----------
+        buffer :: CircularBuffer
+            destination buffer, dtype and data_shape have to match the raw frames
+        source :: socket or file-like object
+            object with recv_into or readinto method
+        nrows :: integer
+            number of points in one frame (one UDP datagram)
+        timeout :: float
+            how often the loop checks if it was stopped, in seconds.
+            Also set as the timeout of a socket source.
+        """
+        self.buffer = buffer
+        self.source = source
+        self.nrows = nrows
+        self.timeout = timeout
+        self.count = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """
+        starts the ingest loop in a daemon thread.
+        """
+        from threading import Thread
+        self.running = True
+        self.thread = Thread(target=self.run, name='ingest', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        stops the ingest loop and waits for the thread to finish.
+        """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        """
+        the ingest loop: waits for data on the source and appends frames
+        until stopped or until a file or stream socket reaches the end of the
+        stream. Sockets get a timeout, so a read blocked in the middle of a
+        frame returns and the loop can check if it was stopped.
+        """
+        from select import select
+        from socket import socket, timeout, SOCK_DGRAM
+        is_socket = isinstance(self.source, socket)
+        if is_socket:
+            self.source.settimeout(self.timeout)
+        datagram = is_socket and self.source.type == SOCK_DGRAM
+        try:
+            fileno = self.source.fileno()
+        except Exception:
+            fileno = None
+        while self.running:
+            if fileno is not None:
+                ready, _, _ = select([fileno], [], [], self.timeout)
+                if not ready:
+                    continue
+            try:
+                n = self.buffer.append_from(self.source, self.nrows)
+            except timeout:
+                continue
+            except OSError as err:
+                error(err)
+                break
+            self.count += n
+            if n < self.nrows and not datagram:
+                debug('end of stream after {} points'.format(self.count))
+                break
+        self.running = False
@@ -0,0 +1,161 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""Memory
+    by Valentyn Stadnytskyi
+    created: October, 2026
+Allocation of the large numpy arrays behind CircularBuffer and Queue.
+The arrays are filled in place, chunk by chunk, so that a buffer never
+needs a second temporary array of the same size (zeros(shape)*nan does).
+"""
+
+import logging
+from logging import debug, info, warning, error
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+CHUNK_BYTES = 2**26  # bytes written per fill step
+HUGE_PAGE = 2**21  # size of a transparent huge page on x86-64 and arm64
+
+
+def allocate(shape, dtype, fill=None, threads=1, align=0, hugepages=False,
+             prefault=False, lock=False):
+    """
+    returns a new array. Without fill the array comes from zeros: the
+    operating system maps zero pages lazily, an untouched buffer does not
+    use resident memory. With fill the array is filled in place.
+
+    The options align, hugepages, prefault and lock put the array into an
+    anonymous memory map, they avoid the page faults of the first pass
+    through a fresh buffer.
+
+    Parameters
+    ----------
+    shape :: tuple
+        shape of the array
+    dtype :: numpy datatype string
+        data type of the array
+    fill :: scalar
+        value of all elements, None for lazily zeroed memory
+    threads :: integer
+        number of threads used to fill the array
+    align :: integer
+        alignment of the rows (first index) in bytes, for example 64 for
+        cache lines. Rows are padded if needed, the array is then not
+        C-contiguous.
+    hugepages :: boolean
+        advises the kernel to back the array with transparent huge pages
+        (madvise MADV_HUGEPAGE)
+    prefault :: boolean
+        touches every page of the array now
+    lock :: boolean
+        locks the array in RAM (mlock), limited by RLIMIT_MEMLOCK
+
+    Returns
+    -------
+    array :: numpy array
+
+    Examples
+    --------
+    >>> buffer = allocate((1000, 4), 'float64', fill=nan)
+    >>> buffer = allocate((10**6, 100), 'int16', align=64, hugepages=True, prefault=True)
+    """
+    from numpy import zeros, empty
+    if align or hugepages or prefault or lock:
+        array = _mapped(shape, dtype, align, hugepages, prefault, lock)
+        if fill is not None:
+            fill_array(array, fill, threads)
+        return array
+    if fill is None:
+        return zeros(shape, dtype=dtype)
+    array = empty(shape, dtype=dtype)
+    fill_array(array, fill, threads)
+    return array
+
+
+def _mapped(shape, dtype, align, hugepages, prefault, lock):
+    """
+    returns an array in an anonymous memory map, see allocate.
+    """
+    import mmap
+    from numpy import dtype as numpy_dtype, ndarray, frombuffer, prod
+    dtype = numpy_dtype(dtype)
+    row_bytes = int(prod(shape[1:], dtype='int64')) * dtype.itemsize
+    stride = -(-row_bytes // align) * align if align else row_bytes
+    nbytes = max(1, stride * shape[0])
+    if hugepages:
+        nbytes = -(-nbytes // HUGE_PAGE) * HUGE_PAGE
+    memory = mmap.mmap(-1, nbytes, flags=mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS)
+    if hugepages:
+        if hasattr(mmap, 'MADV_HUGEPAGE'):
+            memory.madvise(mmap.MADV_HUGEPAGE)
+        else:
+            warning('transparent huge pages are not supported on this platform')
+    if prefault:
+        frombuffer(memory, dtype='uint8')[::mmap.PAGESIZE] = 0
+    if lock:
+        _mlock(memory, nbytes)
+    strides = [dtype.itemsize]
+    for length in reversed(shape[2:]):
+        strides.insert(0, strides[0] * length)
+    strides = (stride,) + tuple(strides[:len(shape) - 1])
+    return ndarray(shape, dtype=dtype, buffer=memory, strides=strides)
+
+
+def _mlock(memory, nbytes):
+    """
+    locks the pages of a memory map in RAM, warns if it is not permitted.
+    """
+    import ctypes
+    import ctypes.util
+    from os import strerror
+    libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    address = ctypes.addressof(ctypes.c_char.from_buffer(memory))
+    if libc.mlock(ctypes.c_void_p(address), ctypes.c_size_t(nbytes)) != 0:
+        warning('mlock of {} bytes failed: {}'.format(nbytes, strerror(ctypes.get_errno())))
+
+
+def fill_array(array, value, threads=1):
+    """
+    sets all elements of an array to value in place, in chunks of about
+    CHUNK_BYTES along the first index. numpy releases the GIL while it
+    fills a chunk, so the chunks can be filled by several threads.
+
+    Parameters
+    ----------
+    array :: numpy array
+        array to fill
+    value :: scalar
+        new value of all elements
+    threads :: integer
+        number of threads
+
+    Returns
+    -------
+
+    Examples
+    --------
+    >>> fill_array(buffer, nan, threads=4)
+    """
+    if array.ndim == 0 or array.shape[0] == 0:
+        array.fill(value)
+        return
+    step = max(1, CHUNK_BYTES // max(1, array[0].nbytes))
+    chunks = [array[i:i+step] for i in range(0, array.shape[0], step)]
+
+    def fill(chunk):
+        chunk.fill(value)
+    if threads > 1 and len(chunks) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(fill, chunks))
+    else:
+        for chunk in chunks:
+            fill(chunk)
+
+
+def missing_value(dtype):
+    """
+    returns the value of an empty element: nan for floating point data
+    types, otherwise 0.
+    """
+    from numpy import dtype as numpy_dtype, nan
+    return nan if numpy_dtype(dtype).kind in 'fc' else 0
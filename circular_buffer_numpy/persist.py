@@ -0,0 +1,137 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""Persist
+    by Valentyn Stadnytskyi
+    created: October, 2026
+Saving and restoring the points and the state of a CircularBuffer or a Queue.
+The points are saved oldest first as a .npy file, written straight from the
+one or two segments of the ring, and read back straight into the ring, so
+saving and restoring a large buffer is limited by the disk. The pointers and
+the other state go into a small .npz file next to it (path + '.npz').
+"""
+
+import logging
+from logging import debug, info, warn, error
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+CHUNK_BYTES = 2**20  # bytes copied at once for arrays with padded rows
+
+
+def header(dtype, shape):
+    """
+    returns the .npy header of an array of the given dtype and shape.
+    """
+    from io import BytesIO
+    from numpy.lib import format
+    from numpy import dtype as numpy_dtype
+    result = BytesIO()
+    format.write_array_header_1_0(result, {'descr': format.dtype_to_descr(numpy_dtype(dtype)),
+                                           'fortran_order': False,
+                                           'shape': tuple(shape)})
+    return result.getvalue()
+
+
+def save(path, segments, dtype, data_shape, state):
+    """
+    saves the points in segments (oldest first) as one .npy file and the
+    state, a dictionary of scalars and arrays, to path + '.npz'.
+
+    Parameters
+    ----------
+    path :: string
+        path of the .npy file
+    segments :: list
+        one or two contiguous numpy arrays with the points, oldest first
+    dtype :: dtype
+        data type of the points
+    data_shape :: tuple
+        shape of one point
+    state :: dictionary
+
+    Returns
+    -------
+    """
+    from numpy import savez
+    n = sum(segment.shape[0] for segment in segments)
+    with open(path, 'wb') as file:
+        file.write(header(dtype, (n,) + tuple(data_shape)))
+        for segment in segments:
+            write_from(file, segment)
+    savez(path + '.npz', **state)
+
+
+def open_saved(path, dtype, data_shape):
+    """
+    opens the points saved by save and checks their dtype and shape.
+
+    Returns
+    -------
+    file, n, state :: tuple
+        the file positioned at the first point, the number of points and
+        the state dictionary
+    """
+    from numpy.lib import format
+    from numpy import load, dtype as numpy_dtype
+    with load(path + '.npz') as saved:
+        state = {key: saved[key] for key in saved.files}
+    file = open(path, 'rb')
+    version = format.read_magic(file)
+    if version == (1, 0):
+        shape, fortran_order, saved_dtype = format.read_array_header_1_0(file)
+    else:
+        shape, fortran_order, saved_dtype = format.read_array_header_2_0(file)
+    if saved_dtype != numpy_dtype(dtype) or tuple(shape[1:]) != tuple(data_shape):
+        file.close()
+        raise Exception('{} holds points of {} {}, expected {} {}'.format(
+            path, shape[1:], saved_dtype, tuple(data_shape), dtype))
+    return file, shape[0], state
+
+
+def _rows(segment):
+    """
+    returns the number of points of a segment copied at once.
+    """
+    return max(1, CHUNK_BYTES // max(1, segment[:1].nbytes))
+
+
+def write_from(file, segment):
+    """
+    writes the points of a segment to file. A C-contiguous segment is
+    written straight from its memory, a segment with padded rows (see the
+    align option of memory.allocate) through a contiguous copy of a chunk
+    of points at a time.
+    """
+    from numpy import ascontiguousarray
+    if segment.flags.c_contiguous:
+        file.write(segment.reshape(-1).view('uint8').data)
+        return
+    rows = _rows(segment)
+    for i in range(0, segment.shape[0], rows):
+        file.write(ascontiguousarray(segment[i:i + rows]).data)
+
+
+def read_into(file, segments):
+    """
+    reads the next points of file into the segments, in place. C-contiguous
+    segments are read straight into their memory, segments with padded
+    rows through a contiguous chunk of points at a time.
+    """
+    from numpy import empty
+    for segment in segments:
+        if segment.flags.c_contiguous:
+            _read_exactly(file, segment.reshape(-1).view('uint8'))
+            continue
+        rows = _rows(segment)
+        chunk = empty((min(rows, segment.shape[0]),) + segment.shape[1:], dtype=segment.dtype)
+        for i in range(0, segment.shape[0], rows):
+            k = min(rows, segment.shape[0] - i)
+            _read_exactly(file, chunk[:k].reshape(-1).view('uint8'))
+            segment[i:i + k] = chunk[:k]
+
+
+def _read_exactly(file, view):
+    """
+    fills a contiguous uint8 array from file.
+    """
+    if file.readinto(memoryview(view)) != view.nbytes:
+        raise Exception('{} ended before all points were read'.format(file.name))
@@ -0,0 +1,136 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""Quantized circular buffer
+    by Valentyn Stadnytskyi
+    created: October, 2026
+A circular buffer that accepts floating point data but stores it in a
+smaller data type: float16, or int8/int16/int32 with a scale and an offset
+per channel. The get_* methods convert the stored values back.
+For example, 12-bit ADC data that arrives as float64 fits into int16 and
+takes a quarter of the memory and of the memory bandwidth.
+"""
+
+import logging
+from logging import debug, info, warn, error
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+from .circular_buffer import CircularBuffer
+
+
+def _dequantized(method):
+    def wrapper(self, *args, **kwargs):
+        from numpy import ndarray, generic
+        out = kwargs.pop('out', None)
+        result = method(self, *args, **kwargs)
+        if isinstance(result, (ndarray, generic)):
+            if result.dtype == self.storage:
+                result = self.dequantize(result, out)
+            elif out is not None:
+                # get_all and get_data return the result of get_last_N.
+                out[...] = result
+                result = out
+        return result
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+class QuantizedCircularBuffer(CircularBuffer):
+    """
+    circular buffer that stores quantized values. append accepts data in any
+    float data type, stores round((data - offset) / scale) in the storage
+    data type and saturates at its limits. The get_* methods return
+    value * scale + offset in the output data type, optionally written into
+    an out= array of the right shape.
+
+    nan cannot be stored in an integer data type, it is stored as 0. If the
+    buffer has a validity bitmap (validity=True), the points with nan are
+    marked invalid.
+
+    Leases, snapshots, reserve and append_from work on the stored values,
+    dequantize converts them.
+
+    :ivar storage: data type of the stored values (dtype)
+    :ivar output_dtype: data type returned by the get_* methods
+    :ivar scale: scale, scalar or one value per channel (data_shape)
+    :ivar offset: offset, scalar or one value per channel (data_shape)
+
+    Examples
+    --------
+    >>> buffer = QuantizedCircularBuffer(shape = (10**6, 8), storage = 'int16', scale = 10.0/2**11)
+    >>> buffer.append(adc_volts)
+    >>> volts = buffer.get_last_N(1000)
+    """
+    def __init__(self, shape=(100, 2), dtype='float64', storage='float16', scale=1.0, offset=0.0, **kwargs):
+        from numpy import dtype as numpy_dtype, asarray
+        CircularBuffer.__init__(self, shape=shape, dtype=storage, **kwargs)
+        self.storage = self.buffer.dtype
+        self.output_dtype = numpy_dtype(dtype)
+        self.scale = asarray(scale, dtype=self.output_dtype)
+        self.offset = asarray(offset, dtype=self.output_dtype)
+        if self.storage.kind not in 'iuf':
+            raise Exception('cannot quantize into {}'.format(self.storage))
+
+    def quantize(self, data):
+        """
+        returns data converted to the stored values.
+
+        Parameters
+        ----------
+        data :: (numpy array)
+            data in the output data type
+
+        Returns
+        -------
+        values :: (numpy array)
+            values in the storage data type
+        """
+        from numpy import rint, clip, iinfo, nan_to_num
+        values = (data - self.offset) / self.scale
+        if self.storage.kind == 'f':
+            return values.astype(self.storage)
+        limits = iinfo(self.storage)
+        values = clip(rint(nan_to_num(values, nan=0.0)), limits.min, limits.max)
+        return values.astype(self.storage)
+
+    def dequantize(self, values, out=None):
+        """
+        returns stored values converted to the output data type.
+
+        Parameters
+        ----------
+        values :: (numpy array)
+            values in the storage data type
+        out :: (numpy array)
+            optional array for the result
+
+        Returns
+        -------
+        data :: (numpy array)
+        """
+        from numpy import multiply, add
+        data = multiply(values, self.scale, out=out, dtype=self.output_dtype)
+        if data.ndim == 0:
+            return data + self.offset
+        return add(data, self.offset, out=data)
+
+    def append(self, data, valid=True):
+        from numpy import asarray, isnan
+        data = asarray(data)
+        if self.valid is not None and data.dtype.kind == 'f':
+            missing = isnan(data.reshape((-1,) + self.data_shape)).reshape(-1, self.buffer[0].size).any(axis=1)
+            if missing.any():
+                valid = asarray(valid, dtype=bool) & ~missing
+        CircularBuffer.append(self, self.quantize(data), valid)
+    append.__doc__ = CircularBuffer.append.__doc__
+
+    get_all = _dequantized(CircularBuffer.get_all)
+    get_data = _dequantized(CircularBuffer.get_data)
+    get_last_N = _dequantized(CircularBuffer.get_last_N)
+    get_last_value = _dequantized(CircularBuffer.get_last_value)
+    get_value = _dequantized(CircularBuffer.get_value)
+    get_i_j = _dequantized(CircularBuffer.get_i_j)
+    get_N = _dequantized(CircularBuffer.get_N)
+    get_N_global = _dequantized(CircularBuffer.get_N_global)
+    get_packet_linear_i_j = _dequantized(CircularBuffer.get_packet_linear_i_j)
+    get_packet_circular_i_j = _dequantized(CircularBuffer.get_packet_circular_i_j)
@@ -18,7 +18,7 @@ isempty() − Checks if the queue is empty.
 """
 
 import logging
-from logging import debug, info, warn, error
+from logging import debug, info, warn, warning, error
 import warnings
 logging.getLogger(__name__).addHandler(logging.NullHandler())
 debug('importing queue')
@@ -29,22 +29,39 @@ class Queue(object):
     :ivar rear: initial value: -1
     :ivar length: initial value: 0
     """
-    def __init__(self, shape=(20, 2), dtype='float64'):
+    def __init__(self, shape=(20, 2), dtype='float64', lazy=False, threads=1, allocation=None, wal=None):
         """
         the queue has front pointer and the length.
-        """
-        from numpy import zeros, nan
-
-        from threading import RLock, Lock
+        A float queue is filled with nan in place, in chunks and with the given
+        number of threads. With lazy=True the queue is zeroed by the operating
+        system page by page when it is written for the first time, an
+        untouched queue does not use resident memory.
+        allocation is a dictionary with the options align, hugepages,
+        prefault and lock of memory.allocate.
+        wal is a WriteAheadLog: the published points and the committed
+        offset are logged, and the queue is rebuilt from the log when it
+        is created.
+        """
+        from .memory import allocate
+
+        from threading import RLock, Lock, Condition
         self.lock = RLock()
+        self.condition = Condition(self.lock)
         self.rear = 0  # the end of the Queue, where new date will be enquequ.
         self.global_rear = 0
 
         self.length = 0
-        if 'float' in dtype:
-            self.buffer = zeros(shape, dtype=dtype) * nan
-        else:
-            self.buffer = zeros(shape, dtype=dtype)
+        self.groups = {}  # consumer group name -> global offset of its next point
+        self.leases = []  # outstanding leases in the order they were claimed
+        self.claimed = 0  # number of points at the front held by leases
+        self.dropped = 0  # number of points enqueue could not store without overwriting leases
+        self.lazy = lazy
+        self.threads = threads
+        self.allocation = allocation or {}
+        self.buffer = allocate(shape, dtype, self._fill_value(dtype), threads, **self.allocation)
+        self.wal = wal
+        if wal is not None:
+            self._recover()
 
     def enqueue(self, data):
         """
@@ -77,18 +94,102 @@ class Queue(object):
             arr = data
         with self.lock:
             try:
-                for j in range(arr.shape[0]):
-                    self.buffer[self.rear] = arr[j]
-                    self.rear += 1
-                    self.global_rear += 1
-                    if self.rear == self.shape[0]:
-                        self.rear = 0
-
-                    if self.length != self.shape[0]:
-                        self.length += 1
+                n = arr.shape[0]
+                if self.claimed:
+                    # the oldest points are leased and cannot be overwritten,
+                    # only the free slots can be used, drop what does not fit.
+                    allowed = self.shape[0] - self.length
+                    if n > allowed:
+                        self.dropped += n - allowed
+                        warning('queue has leased points and no free slots, dropped {} points'.format(n - allowed))
+                        arr = arr[:allowed]
+                        n = allowed
+                elif n > self.shape[0]:
+                    # only the last shape[0] points survive, the rest is skipped.
+                    if self.wal is not None:
+                        self.wal.skip(n - self.shape[0])
+                    self._advance(n - self.shape[0])
+                    arr = arr[n - self.shape[0]:]
+                    n = self.shape[0]
+                i = 0
+                for segment in self.reserve(n):
+                    segment[...] = arr[i:i+segment.shape[0]]
+                    i += segment.shape[0]
+                self.publish(n)
             except Exception as err:
                 error(err)
 
+    def reserve(self, n):
+        """
+        returns writable views of the next n slots in the queue. The producer
+        writes data directly into the views and publishes them with
+        publish(n). The slots wrap around the end of the buffer, in which
+        case two views are returned. Unread points can be overwritten, the
+        same way enqueue does, but while leases are outstanding only the free
+        slots can be reserved.
+
+        Parameters
+        ----------
+        n :: integer
+            number of points to reserve
+
+        Returns
+        -------
+        segments :: list
+            one or two numpy arrays (views of the buffer) with n points in total
+
+        Examples
+        --------
+        >>> queue = Queue(shape = (10,4))
+        >>> for segment in queue.reserve(6):
+        ...     segment[:] = 1.0
+        >>> queue.publish(6)
+        >>> queue.length
+        6
+        """
+        with self.lock:
+            available = self.shape[0] - self.length if self.claimed else self.shape[0]
+            if n > available:
+                raise Exception('cannot reserve {} points, only {} slots are available'.format(n, available))
+            S = self.shape[0]
+            stop = self.rear + n
+            if stop <= S:
+                return [self.buffer[self.rear:stop]]
+            return [self.buffer[self.rear:], self.buffer[:stop - S]]
+
+    def publish(self, n):
+        """
+        adds n points written into the slots returned by reserve(n) to the queue.
+
+        Parameters
+        ----------
+        n :: integer
+            number of points to publish
+
+        Returns
+        -------
+        None
+
+        Examples
+        --------
+        >>> queue.publish(6)
+        """
+        if n <= 0:
+            return
+        with self.lock:
+            if self.wal is not None:
+                self.wal.append(self._segments(self.rear, n))
+            self._advance(n)
+
+    def _advance(self, n):
+        """
+        moves the rear by n points.
+        """
+        with self.lock:
+            self.rear = (self.rear + n) % self.shape[0]
+            self.global_rear += n
+            self.length = min(self.length + n, self.shape[0])
+            self.condition.notify_all()
 
     def dequeue(self, N=0):
         """
@@ -127,12 +228,321 @@ class Queue(object):
                 # data = self.peek_i_j(i_pointer, j_pointer)
                 data = self.peek_first_N(N)
                 self.length -= N
+                self._log_offset()
             else:
                 data = None
-            debug(f'data shape = {data.shape}')
+            debug(f'data shape = {getattr(data, "shape", None)}')
             debug(f'======== dequeue === end ======')
         return data
 
+    def dequeue_batch(self, max_n, max_wait):
+        """
+        remove (access) up to max_n items from the queue. Waits until max_n
+        items are available or max_wait seconds have elapsed, whichever
+        comes first, and returns everything available at that moment as one
+        contiguous block.
+
+        Parameters
+        ----------
+        max_n :: integer
+            maximum number of points to return, values larger than the
+            length of the queue buffer are clipped to it
+        max_wait :: float
+            maximum time to wait for max_n points, in seconds
+
+        Returns
+        -------
+        array :: numpy array
+            between 1 and max_n points, or None if the queue stayed empty
+
+        Examples
+        --------
+        >>> queue = Queue(shape = (100,2))
+        >>> queue.enqueue(random(size=(3,2)))
+        >>> queue.dequeue_batch(max_n = 10, max_wait = 0.1).shape
+        (3, 2)
+        """
+        from time import monotonic
+        # the queue never holds more than shape[0] points.
+        max_n = min(max_n, self.shape[0])
+        deadline = monotonic() + max_wait
+        with self.condition:
+            while self.length < max_n:
+                timeout = deadline - monotonic()
+                if timeout <= 0:
+                    break
+                self.condition.wait(timeout)
+            N = min(self.length, max_n)
+            if N == 0:
+                return None
+            return self.dequeue(N)
+
+    # Two-phase dequeue: claim points, process them in place, then commit or release.
+    def claim(self, N):
+        """
+        leases N points from the front of the queue without removing them.
+        The leased points stay in the queue and cannot be overwritten by
+        enqueue until the lease is committed (removes the points) or released
+        (makes the points available to the next claim). Claims are taken in
+        order, a second claim returns the points after the first one.
+        Do not mix claim and dequeue on the same queue.
+
+        Parameters
+        ----------
+        N :: integer
+            number of points
+
+        Returns
+        -------
+        lease :: Lease
+            lease with the claimed points in lease.data, a list of one or two
+            views of the queue buffer (two if the claim wraps around the end
+            of the buffer), or None if fewer than N unclaimed points are
+            available
+
+        Examples
+        --------
+        >>> lease = queue.claim(10)
+        >>> for segment in lease.data:
+        ...     process(segment)
+        >>> queue.commit(lease)
+        """
+        with self.lock:
+            if N <= 0 or self.length - self.claimed < N:
+                return None
+            S = self.shape[0]
+            start = self.global_rear - self.length + self.claimed
+            i = start % S
+            j = i + N
+            if j <= S:
+                data = [self.buffer[i:j]]
+            else:
+                data = [self.buffer[i:], self.buffer[:j - S]]
+            lease = Lease(self, start, N, data)
+            self.claimed += N
+            self.leases.append(lease)
+        return lease
+
+    def commit(self, lease):
+        """
+        acknowledges a lease and removes its points from the queue. The space
+        is freed once all earlier leases are committed as well.
+
+        Parameters
+        ----------
+        lease :: Lease
+            lease returned by claim
+
+        Returns
+        -------
+        None
+
+        Examples
+        --------
+        >>> queue.commit(lease)
+        """
+        with self.lock:
+            if lease not in self.leases:
+                raise Exception('lease is not outstanding')
+            lease.committed = True
+            while self.leases and self.leases[0].committed:
+                done = self.leases.pop(0)
+                self.length -= done.N
+                self.claimed -= done.N
+            self._log_offset()
+
+    def release(self, lease):
+        """
+        returns the points of a lease to the queue without removing them, so
+        the next claim gets them again. All leases claimed after this one are
+        released too, which keeps the points in order.
+
+        Parameters
+        ----------
+        lease :: Lease
+            lease returned by claim
+
+        Returns
+        -------
+        None
+
+        Examples
+        --------
+        >>> queue.release(lease)
+        """
+        with self.lock:
+            if lease not in self.leases:
+                raise Exception('lease is not outstanding')
+            idx = self.leases.index(lease)
+            for released in self.leases[idx:]:
+                self.claimed -= released.N
+                released.released = True
+            del self.leases[idx:]
+
+    # Consumer groups: every group reads the same stream with its own offset
+    # in the global_rear space. The queue length is defined by the slowest group.
+    def add_group(self, name, offset=None):
+        """
+        registers a consumer group. Each group dequeues every point in the
+        queue independently of the other groups, and the space in the queue
+        is freed only once the slowest group has advanced past it.
+        Once groups are registered, use dequeue_group instead of dequeue.
+
+        Parameters
+        ----------
+        name :: string
+            name of the consumer group
+        offset :: integer
+            global index of the first point to dequeue, defaults to the
+            current front of the queue
+
+        Returns
+        -------
+        None
+
+        Examples
+        --------
+        >>> queue = Queue(shape = (100,2))
+        >>> queue.add_group('archive')
+        >>> queue.add_group('display')
+        """
+        with self.lock:
+            if offset is None:
+                offset = self.global_rear - self.length
+            self.groups[name] = offset
+            self.seek(name, offset)
+
+    def remove_group(self, name):
+        """
+        unregisters a consumer group and frees the space it was holding.
+        """
+        with self.lock:
+            del self.groups[name]
+            self._free()
+
+    def seek(self, name, offset):
+        """
+        moves the offset of a consumer group to a global index. The offset
+        has to point at a point still available in the queue buffer.
+
+        Parameters
+        ----------
+        name :: string
+            name of the consumer group
+        offset :: integer
+            global index of the next point to dequeue
+
+        Returns
+        -------
+        None
+
+        Examples
+        --------
+        >>> queue.seek('display', queue.global_rear - 1)
+        """
+        with self.lock:
+            if name not in self.groups:
+                raise Exception('consumer group {} is not registered'.format(name))
+            oldest = self.global_rear - min(self.global_rear, self.shape[0])
+            if not oldest <= offset <= self.global_rear:
+                raise Exception('offset {} is outside of the available range [{}, {}]'.format(offset, oldest, self.global_rear))
+            self.groups[name] = offset
+            self._free()
+
+    def group_length(self, name):
+        """
+        returns number of points waiting to be dequeued by a consumer group.
+        """
+        with self.lock:
+            return self.global_rear - self._group_offset(name)
+
+    def dequeue_group(self, name, N=0):
+        """
+        remove (access) N points from the queue on behalf of a consumer group.
+        The points remain available to the other groups.
+
+        Parameters
+        ----------
+        name :: string
+            name of the consumer group
+        N :: integer
+            number of points
+
+        Returns
+        -------
+        array :: numpy array
+            N points or None if fewer than N points are waiting for the group
+
+        Examples
+        --------
+        >>> data = queue.dequeue_group('archive', N = 10)
+        """
+        with self.lock:
+            offset = self._group_offset(name)
+            if N <= 0 or self.global_rear - offset < N:
+                return None
+            S = self.shape[0]
+            data = self.peek_i_j(offset % S, (offset + N) % S)
+            self.groups[name] = offset + N
+            self._free()
+        return data
+
+    def _group_offset(self, name):
+        """
+        returns offset of a consumer group, moving it forward if the group
+        was lapped by enqueue and lost points.
+        """
+        oldest = self.global_rear - min(self.global_rear, self.shape[0])
+        offset = self.groups[name]
+        if offset < oldest:
+            warning('consumer group {} lost {} points'.format(name, oldest - offset))
+            offset = self.groups[name] = oldest
+        return offset
+
+    def _free(self):
+        """
+        updates the length of the queue from the slowest consumer group.
+        """
+        if self.groups:
+            oldest = self.global_rear - min(self.global_rear, self.shape[0])
+            self.length = self.global_rear - max(oldest, min(self.groups.values()))
+            self._log_offset()
+
+    def _log_offset(self):
+        """
+        commits the front of the queue in the write-ahead log.
+        """
+        if self.wal is not None:
+            self.wal.commit(self.global_rear - self.length)
+
+    def _recover(self):
+        """
+        rebuilds the queue from the points after the committed offset of
+        the write-ahead log.
+        """
+        S = self.shape[0]
+        offset, end = self.wal.attach(self.dtype, self.data_shape)
+        n = end - offset
+        if n > S:
+            warning('the log holds {} points after the committed offset, the queue keeps the last {}'.format(n, S))
+            n = S
+        self.global_rear = end
+        self.rear = end % S
+        self.length = n
+        self.wal.read_into(end - n, self._segments((end - n) % S, n))
+        debug('recovered {} points from the log'.format(n))
+
+    def _segments(self, start, n):
+        """
+        returns one or two views of the queue buffer with n points starting
+        at index start.
+        """
+        S = self.shape[0]
+        stop = start + n
+        if stop <= S:
+            return [self.buffer[start:stop]]
+        return [self.buffer[start:], self.buffer[:stop - S]]
+
     # Few more functions are required to make the above-mentioned queue operation efficient. These are −
     @property
     def isfull(self):
@@ -196,6 +606,12 @@ class Queue(object):
         self.rear = 0  # the last written element
         self.global_rear = 0
         self.length = 0  # the last read element
+        for name in self.groups:
+            self.groups[name] = 0
+        self.leases = []
+        self.claimed = 0
+        if self.wal is not None:
+            self.wal.reset()
 
     def reshape(self, shape, dtype=None):
         """
@@ -220,15 +636,107 @@ class Queue(object):
         >>> queue.shape
             (1000,2)
         """
-        from numpy import zeros, nan
+        from .memory import allocate
         if dtype is None:
             dtype = self.dtype
-        if 'float' in dtype:
-            self.buffer = zeros(shape, dtype=dtype) * nan
-        else:
-            self.buffer = zeros(shape, dtype=dtype)
+        # the old buffer is released first, the peak memory is one buffer.
+        self.buffer = None
+        self.buffer = allocate(shape, dtype, self._fill_value(dtype), self.threads, **self.allocation)
         self.reset()
 
+    def save(self, path):
+        """
+        saves the points in the queue, front first, as a .npy file at path,
+        written straight from the queue buffer, and rear, length,
+        global_rear and the consumer groups to path + '.npz'. Outstanding
+        leases are not saved, their points are saved as not dequeued.
+
+        Parameters
+        ----------
+        path :: string
+            path of the .npy file
+
+        Returns
+        -------
+        None
+
+        Examples
+        --------
+        >>> queue.save('/data/queue.npy')
+        """
+        from numpy import array
+        from . import persist
+        with self.lock:
+            S = self.shape[0]
+            start = (self.global_rear - self.length) % S
+            stop = start + self.length
+            if stop <= S:
+                segments = [self.buffer[start:stop]]
+            else:
+                segments = [self.buffer[start:], self.buffer[:stop - S]]
+            state = {'rear': self.rear, 'length': self.length, 'global_rear': self.global_rear,
+                     'dropped': self.dropped, 'group_names': array(list(self.groups), dtype=str),
+                     'group_offsets': array(list(self.groups.values()), dtype='int64')}
+            persist.save(path, segments, self.dtype, self.data_shape, state)
+
+    def load(self, path):
+        """
+        restores the points and the state saved by save, the points are read
+        straight into the queue buffer. dtype and data_shape have to match
+        and the queue has to be long enough for the saved points. The log of
+        a queue with a write-ahead log is replaced by the loaded points at
+        their global indices.
+
+        Parameters
+        ----------
+        path :: string
+            path of the .npy file
+
+        Returns
+        -------
+        None
+
+        Examples
+        --------
+        >>> queue = Queue(shape = (10**7, 4))
+        >>> queue.load('/data/queue.npy')
+        """
+        from . import persist
+        file, n, state = persist.open_saved(path, self.dtype, self.data_shape)
+        with file, self.condition:
+            S = self.shape[0]
+            if n > S:
+                raise Exception('{} holds {} points, the queue has room for {}'.format(path, n, S))
+            self.reset()
+            self.global_rear = int(state['global_rear'])
+            self.rear = self.global_rear % S
+            start = (self.global_rear - n) % S
+            stop = start + n
+            if stop <= S:
+                segments = [self.buffer[start:stop]]
+            else:
+                segments = [self.buffer[start:], self.buffer[:stop - S]]
+            persist.read_into(file, segments)
+            if self.wal is not None:
+                # reset emptied the log, the loaded points are logged again.
+                self.wal.skip(self.global_rear - n)
+                self.wal.append(segments)
+            self.length = n
+            self.dropped = int(state['dropped'])
+            names, offsets = state['group_names'], state['group_offsets']
+            self.groups = {str(name): int(offset) for name, offset in zip(names, offsets)}
+            self._log_offset()
+            self.condition.notify_all()
+
+    def _fill_value(self, dtype):
+        """
+        returns nan for float queues, None (lazily zeroed memory) otherwise.
+        """
+        from .memory import missing_value
+        if self.lazy or 'float' not in str(dtype):
+            return None
+        return missing_value(dtype)
+
     @property
     def size(self):
         """
@@ -388,6 +896,35 @@ class Queue(object):
 
 
 
+class Lease(object):
+    """
+    points claimed from a Queue with Queue.claim. The lease can be used as a
+    context manager: it is committed on normal exit and released if an
+    exception is raised.
+
+    :ivar data: claimed points, list of one or two views of the queue buffer
+    :ivar start: global index of the first claimed point
+    :ivar N: number of claimed points
+    """
+    def __init__(self, queue, start, N, data):
+        self.queue = queue
+        self.start = start
+        self.N = N
+        self.data = data
+        self.committed = False
+        self.released = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.queue.commit(self)
+        else:
+            self.queue.release(self)
+        return False
+
+
 if __name__ == "__main__":  # for testing purposes
     from pdb import pm
 
@@ -0,0 +1,214 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""Record buffer
+    by Valentyn Stadnytskyi
+    created: October, 2026
+A circular buffer for records of variable length (compressed images, event
+lists) that does not pad the records to a maximum size. The bytes of the
+records are stored back to back in a byte ring, a second ring stores the
+global byte offset and the length of every record. The oldest records are
+evicted as a whole when the bytes or the index run out.
+"""
+
+import logging
+from logging import debug, info, warn, error
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+
+class RecordBuffer(object):
+    """
+    circular buffer of variable-length records.
+
+    :ivar g_pointer: global index of the last record, initial value: -1
+    :ivar first: global index of the oldest record in the buffer
+    :ivar g_bytes: global byte offset after the last record
+
+    Examples
+    --------
+    >>> buffer = RecordBuffer(nbytes = 2**20, max_records = 10000)
+    >>> buffer.append(b'event')
+    >>> buffer.get_bytes(buffer.g_pointer)
+    b'event'
+    """
+    def __init__(self, nbytes=2**20, max_records=1024):
+        from numpy import zeros
+        self.buffer = zeros(nbytes, dtype='uint8')
+        self.offsets = zeros(max_records, dtype='int64')
+        self.lengths = zeros(max_records, dtype='int64')
+        self.g_pointer = -1
+        self.first = 0
+        self.g_bytes = 0
+
+    def append(self, record):
+        """
+        appends one record.
+
+        Parameters
+        ----------
+        record :: bytes-like object or numpy array
+
+        Returns
+        -------
+
+        Examples
+        --------
+        >>> buffer.append(b'event')
+        """
+        from numpy import frombuffer, ascontiguousarray
+        data = frombuffer(ascontiguousarray(record).data.cast('B'), dtype='uint8') \
+            if hasattr(record, 'dtype') else frombuffer(record, dtype='uint8')
+        self.append_many(data, [data.shape[0]])
+
+    def append_many(self, data, lengths):
+        """
+        appends many records at once. The records are given back to back in
+        data, lengths gives their lengths in bytes. If the records do not fit
+        into the buffer, only the last ones are kept.
+
+        Parameters
+        ----------
+        data :: bytes-like object or numpy array
+            the bytes of all records
+        lengths :: array of integers
+            length of every record
+
+        Returns
+        -------
+
+        Examples
+        --------
+        >>> buffer.append_many(b'abcdef', [1, 2, 3])
+        """
+        from numpy import frombuffer, asarray, cumsum, searchsorted, concatenate
+        data = frombuffer(data, dtype='uint8') if not hasattr(data, 'dtype') else data.reshape(-1).view('uint8')
+        lengths = asarray(lengths, dtype='int64')
+        n = lengths.shape[0]
+        if n == 0:
+            return
+        if lengths.max() > self.nbytes:
+            raise Exception('record of {} bytes does not fit into {} bytes'.format(lengths.max(), self.nbytes))
+        if int(lengths.sum()) != data.shape[0]:
+            raise Exception('lengths add up to {} bytes, data has {}'.format(int(lengths.sum()), data.shape[0]))
+        offsets = self.g_bytes + concatenate(([0], cumsum(lengths)[:-1]))
+        # the records that fit, the others are skipped as if evicted right away
+        keep = min(int(searchsorted(cumsum(lengths[::-1]), self.nbytes, side='right')), self.max_records)
+        skip = n - keep
+        end = self.g_bytes + data.shape[0]
+        self._evict(end - self.nbytes, self.g_pointer + n + 1 - self.max_records)
+        if self.first > self.g_pointer:
+            self.first = self.g_pointer + 1 + skip
+        self._write(self.buffer, offsets[skip], data[int(offsets[skip] - self.g_bytes):])
+        self._write(self.offsets, self.g_pointer + 1 + skip, offsets[skip:])
+        self._write(self.lengths, self.g_pointer + 1 + skip, lengths[skip:])
+        self.g_pointer += n
+        self.g_bytes = end
+
+    def _evict(self, limit, first):
+        """
+        evicts the records before global index first and the records that
+        start before the global byte offset limit.
+        """
+        # binary search for the oldest record that starts at or after limit
+        lo, hi = max(self.first, first), self.g_pointer + 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.offsets[mid % self.max_records] < limit:
+                lo = mid + 1
+            else:
+                hi = mid
+        self.first = lo
+
+    def _write(self, ring, start, values):
+        """
+        copies values into a ring starting at the global index start.
+        """
+        i = 0
+        for slc in self._slices(start % ring.shape[0], values.shape[0], ring.shape[0]):
+            ring[slc] = values[i:i + slc.stop - slc.start]
+            i += slc.stop - slc.start
+
+    def get_record(self, i):
+        """
+        returns the record with the global index i without copying it: one
+        view of the byte ring, or two views if the record wraps around the
+        end of the ring. The views are overwritten when the record is evicted.
+
+        Parameters
+        ----------
+        i :: integer
+            global index of the record
+
+        Returns
+        -------
+        segments :: list
+            one or two uint8 numpy arrays
+
+        Examples
+        --------
+        >>> segments = buffer.get_record(buffer.g_pointer)
+        """
+        if i < self.first or i > self.g_pointer:
+            raise Exception('record {} is not in the buffer'.format(i))
+        offset = self.offsets[i % self.max_records]
+        length = self.lengths[i % self.max_records]
+        return [self.buffer[slc] for slc in self._slices(offset % self.nbytes, length, self.nbytes)]
+
+    def get_bytes(self, i):
+        """
+        returns a copy of the record with the global index i as bytes.
+        """
+        return b''.join(segment.tobytes() for segment in self.get_record(i))
+
+    def get_N_global(self, N=0, M=0):
+        """
+        returns the N records before global index M (including M), every
+        record as a list of segments (see get_record).
+        """
+        return [self.get_record(i) for i in range(M - N + 1, M + 1)]
+
+    def get_last_N(self, N):
+        """
+        returns the last N records, every record as a list of segments (see
+        get_record).
+        """
+        return self.get_N_global(N, self.g_pointer)
+
+    def _slices(self, start, n, length):
+        """
+        returns one or two slices that cover n elements starting at circular
+        index start of a ring of the given length.
+        """
+        stop = start + n
+        if stop <= length:
+            return [slice(start, stop)]
+        return [slice(start, length), slice(0, stop - length)]
+
+    @property
+    def length(self):
+        """
+        integer: number of records in the buffer
+        """
+        return self.g_pointer + 1 - self.first
+
+    @property
+    def nbytes(self):
+        """
+        integer: size of the byte ring
+        """
+        return self.buffer.shape[0]
+
+    @property
+    def max_records(self):
+        """
+        integer: size of the index ring
+        """
+        return self.offsets.shape[0]
+
+    @property
+    def used(self):
+        """
+        integer: bytes used by the records in the buffer
+        """
+        if self.length == 0:
+            return 0
+        return self.g_bytes - int(self.offsets[self.first % self.max_records])
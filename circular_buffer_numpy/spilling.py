@@ -0,0 +1,179 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""Spilling queue
+    by Valentyn Stadnytskyi
+    created: October, 2026
+A Queue that never drops or overwrites points. When the queue buffer is full,
+enqueue appends the overflow to segment files on disk, dequeue reads them
+back in order as soon as the queue buffer has room. As long as the consumer
+keeps up, no file is touched and the queue runs at the in-memory speed.
+"""
+
+import logging
+from logging import debug, info, warn, error
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+from .queue import Queue
+
+
+class Segment(object):
+    """
+    append-only spill file of a SpillingQueue.
+
+    :ivar path: path of the file
+    :ivar rows: number of points written
+    :ivar read: number of points read back
+    """
+    def __init__(self, path):
+        self.path = path
+        self.writer = open(path, 'wb')
+        self.reader = open(path, 'rb')
+        self.rows = 0
+        self.read = 0
+
+    def close(self):
+        """
+        closes and deletes the file.
+        """
+        from os import remove
+        self.writer.close()
+        self.reader.close()
+        remove(self.path)
+
+
+class SpillingQueue(Queue):
+    """
+    queue that spills to disk instead of overwriting points. The points on
+    disk (spilled) come after the points in the queue buffer (length), in
+    the order they were enqueued.
+
+    reserve only returns free slots and only when nothing is spilled, so that
+    the order is kept. Consumer groups are not supported, they rely on
+    overwriting.
+
+    :ivar directory: directory of the spill files
+    :ivar spilled: number of points on disk
+    :ivar segments: spill files, oldest first
+
+    Examples
+    --------
+    >>> queue = SpillingQueue(shape = (10**5, 64), dtype = 'int16', directory = '/data/spill')
+    >>> queue.enqueue(data)
+    >>> data = queue.dequeue(1000)
+    """
+    def __init__(self, shape=(20, 2), dtype='float64', directory=None, segment_bytes=2**28, **kwargs):
+        """
+        directory is the directory of the spill files, a temporary
+        directory by default. A spill file is closed when it reaches
+        segment_bytes, and deleted when all its points are read back.
+        """
+        from tempfile import mkdtemp
+        from os import makedirs
+        Queue.__init__(self, shape=shape, dtype=dtype, **kwargs)
+        if directory is None:
+            directory = mkdtemp(prefix='queue-spill-')
+        makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_rows = max(1, segment_bytes // max(1, self.buffer[0].nbytes))
+        self.segments = []
+        self.spilled = 0
+        self.count = 0  # number of spill files created
+
+    def enqueue(self, data):
+        from numpy import asarray, ascontiguousarray
+        arr = asarray(data, dtype=self.dtype).reshape((-1,) + self.data_shape)
+        with self.lock:
+            # points go to the queue buffer only while nothing is spilled.
+            free = 0 if self.spilled else self.shape[0] - self.length
+            if free:
+                Queue.enqueue(self, arr[:free])
+            if arr.shape[0] > free:
+                self._spill(ascontiguousarray(arr[free:]))
+    enqueue.__doc__ = Queue.enqueue.__doc__
+
+    def _spill(self, arr):
+        """
+        appends points to the spill files.
+        """
+        from os.path import join
+        i = 0
+        while i < arr.shape[0]:
+            if not self.segments or self.segments[-1].rows == self.segment_rows:
+                self.segments.append(Segment(join(self.directory, 'spill_{:09d}.bin'.format(self.count))))
+                self.count += 1
+            segment = self.segments[-1]
+            n = min(arr.shape[0] - i, self.segment_rows - segment.rows)
+            segment.writer.write(arr[i:i+n].data)
+            segment.rows += n
+            self.spilled += n
+            i += n
+        debug('spilled {} points, {} on disk'.format(arr.shape[0], self.spilled))
+
+    def _refill(self):
+        """
+        moves spilled points into the free slots of the queue buffer, oldest
+        first, reading straight into the slots.
+        """
+        from .persist import read_into
+        while self.spilled and self.length < self.shape[0]:
+            segment = self.segments[0]
+            n = min(self.shape[0] - self.length, segment.rows - segment.read)
+            segment.writer.flush()
+            read_into(segment.reader, Queue.reserve(self, n))
+            Queue.publish(self, n)
+            segment.read += n
+            self.spilled -= n
+            if segment.read == segment.rows and (segment.rows == self.segment_rows or not self.spilled):
+                self.segments.pop(0).close()
+
+    def dequeue(self, N=0):
+        with self.lock:
+            self._refill()
+            return Queue.dequeue(self, N)
+    dequeue.__doc__ = Queue.dequeue.__doc__
+
+    def dequeue_batch(self, max_n, max_wait):
+        with self.condition:
+            self._refill()
+            return Queue.dequeue_batch(self, max_n, max_wait)
+    dequeue_batch.__doc__ = Queue.dequeue_batch.__doc__
+
+    def claim(self, N):
+        with self.lock:
+            self._refill()
+            return Queue.claim(self, N)
+    claim.__doc__ = Queue.claim.__doc__
+
+    def reserve(self, n):
+        with self.lock:
+            available = 0 if self.spilled else self.shape[0] - self.length
+            if n > available:
+                raise Exception('cannot reserve {} points, only {} slots are free, use enqueue'.format(
+                    n, available))
+            return Queue.reserve(self, n)
+    reserve.__doc__ = Queue.reserve.__doc__
+
+    def add_group(self, name, offset=None):
+        raise Exception('consumer groups are not supported by SpillingQueue')
+
+    def reset(self):
+        with self.lock:
+            self.clear_spill()
+            Queue.reset(self)
+    reset.__doc__ = Queue.reset.__doc__
+
+    def clear_spill(self):
+        """
+        deletes the spill files and the points in them.
+        """
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+        self.spilled = 0
+
+    @property
+    def backlog(self):
+        """
+        integer: number of points waiting, in the queue buffer and on disk
+        """
+        return self.length + self.spilled
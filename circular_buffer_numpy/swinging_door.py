@@ -0,0 +1,190 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""Swinging door compression
+    by Valentyn Stadnytskyi
+    created: October, 2026
+Streaming swinging-door compression of analog channels for long-horizon
+trends. The samples are replaced by the vertices of a piecewise-linear
+curve that stays within the error bound of every sample. The vertices of
+every channel are kept in a circular buffer, reads interpolate them back to
+a requested time grid.
+"""
+
+import logging
+from logging import debug, info, warn, warning, error
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+from .circular_buffer import CircularBuffer
+
+WINDOW = 256  # samples compared at once while the door stays open
+
+
+class SwingingDoor(object):
+    """
+    swinging-door compressor. A segment starts at a vertex (the anchor), the
+    upper and lower doors are the smallest and largest slopes from the anchor
+    that pass within error of all samples so far. When the doors close, a
+    vertex is placed at the previous sample on a line between the doors, so
+    that every sample is within error of the piecewise-linear curve.
+
+    The times have to increase strictly.
+
+    :ivar error: error bound, scalar or one value per channel
+    :ivar vertices: one circular buffer of (time, value) vertices per channel
+    :ivar consumed: global index of the last point consumed from a circular buffer
+
+    Examples
+    --------
+    >>> door = SwingingDoor(error = 0.01, channels = 4)
+    >>> door.compress(times, values)
+    >>> trend = door.interpolate(grid)
+    """
+    def __init__(self, error=0.0, channels=1, max_vertices=4096):
+        from numpy import broadcast_to, asarray
+        self.channels = channels
+        self.error = broadcast_to(asarray(error, dtype='float64'), (channels,))
+        self.vertices = [CircularBuffer(shape=(max_vertices, 2), dtype='float64') for i in range(channels)]
+        self.state = [None] * channels  # (anchor, lower, upper, last) of every channel
+        self.consumed = -1
+
+    def compress(self, times, values):
+        """
+        compresses a block of samples.
+
+        Parameters
+        ----------
+        times :: (numpy array)
+            n increasing times
+        values :: (numpy array)
+            n x channels samples
+
+        Returns
+        -------
+        """
+        from numpy import asarray
+        times = asarray(times, dtype='float64')
+        values = asarray(values, dtype='float64').reshape(times.shape[0], self.channels)
+        if times.shape[0] == 0:
+            return
+        for channel in range(self.channels):
+            vertices = self._compress(channel, times, values[:, channel])
+            if vertices:
+                self.vertices[channel].append(asarray(vertices))
+
+    def _compress(self, channel, t, v):
+        """
+        runs the doors of one channel over a block and returns the new vertices.
+        """
+        from numpy import minimum, maximum, concatenate, argmax, inf, clip
+        E = self.error[channel]
+        vertices = []
+        if self.state[channel] is None:
+            anchor, lower, upper = (t[0], v[0]), -inf, inf
+            vertices.append(anchor)
+            last = anchor
+            i = 1
+        else:
+            anchor, lower, upper, last = self.state[channel]
+            i = 0
+        n = t.shape[0]
+        while i < n:
+            dt = t[i:i+WINDOW] - anchor[0]
+            dv = v[i:i+WINDOW] - anchor[1]
+            up = minimum.accumulate(concatenate(([upper], (dv + E) / dt)))
+            lo = maximum.accumulate(concatenate(([lower], (dv - E) / dt)))
+            closed = lo[1:] > up[1:]
+            if not closed.any():
+                lower, upper = lo[-1], up[-1]
+                i += dt.shape[0]
+                continue
+            k = int(argmax(closed))
+            # the previous sample becomes a vertex, on a line between its doors
+            previous = (t[i+k-1], v[i+k-1]) if i + k > 0 else last
+            span = previous[0] - anchor[0]
+            slope = clip((previous[1] - anchor[1]) / span, lo[k], up[k])
+            anchor = (previous[0], anchor[1] + slope * span)
+            vertices.append(anchor)
+            lower, upper = -inf, inf
+            i += k
+        self.state[channel] = (anchor, lower, upper, (t[-1], v[-1]))
+        return vertices
+
+    def consume(self, buffer, time_column=0):
+        """
+        compresses the points appended to a circular buffer since the last
+        call. The column time_column of the points holds the time, the other
+        columns are the channels.
+
+        Parameters
+        ----------
+        buffer :: CircularBuffer
+            circular buffer with points (time, channel 1, channel 2, ...)
+        time_column :: integer
+            column with the time
+
+        Returns
+        -------
+        n :: integer
+            number of points compressed
+
+        Examples
+        --------
+        >>> door.consume(buffer)
+        """
+        from numpy import delete
+        n = buffer.g_pointer - self.consumed
+        if n > buffer.length:
+            warning('{} points were overwritten before they were compressed'.format(n - buffer.length))
+            n = buffer.length
+        if n <= 0:
+            return 0
+        points = buffer.get_N_global(n, buffer.g_pointer)
+        self.compress(points[:, time_column], delete(points, time_column, axis=1))
+        self.consumed = buffer.g_pointer
+        return n
+
+    def get_vertices(self, channel=0):
+        """
+        returns the vertices (time, value) of a channel including a vertex at
+        the time of the last sample, on a line between the doors, which ends
+        the open segment.
+        """
+        from numpy import concatenate, array, clip
+        vertices = self.vertices[channel].get_data()
+        if self.state[channel] is not None:
+            anchor, lower, upper, last = self.state[channel]
+            if last[0] > anchor[0]:
+                span = last[0] - anchor[0]
+                slope = clip((last[1] - anchor[1]) / span, lower, upper)
+                vertices = concatenate((vertices, array([(last[0], anchor[1] + slope * span)])))
+        return vertices
+
+    def interpolate(self, times):
+        """
+        returns the piecewise-linear curve of all channels at the given
+        times, nan outside of the stored vertices.
+
+        Parameters
+        ----------
+        times :: (numpy array)
+            time grid
+
+        Returns
+        -------
+        values :: (numpy array)
+            len(times) x channels
+
+        Examples
+        --------
+        >>> trend = door.interpolate(linspace(t0, t1, 1000))
+        """
+        from numpy import asarray, empty, interp, nan
+        times = asarray(times, dtype='float64')
+        values = empty((times.shape[0], self.channels))
+        for channel in range(self.channels):
+            vertices = self.get_vertices(channel)
+            if vertices.shape[0] == 0:
+                values[:, channel] = nan
+            else:
+                values[:, channel] = interp(times, vertices[:, 0], vertices[:, 1], left=nan, right=nan)
+        return values
@@ -0,0 +1,98 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""test Archive
+    by Valentyn Stadnytskyi
+    created: October, 2026
+
+    to run unittest: python3 -m unittest test_archive
+"""
+import unittest
+from numpy.testing import assert_array_equal
+
+
+class ArchiveTest(unittest.TestCase):
+    def test_flush(self):
+        from ..archive import Archive, open_segments
+        from ..circular_buffer import CircularBuffer
+        from tempfile import TemporaryDirectory
+        from numpy import arange, concatenate
+        data = arange(300 * 3, dtype='int32').reshape(300, 3)
+        buffer = CircularBuffer(shape=(50, 3), dtype='int32')
+        buffer.append(data[:10])
+        with TemporaryDirectory() as directory:
+            archive = Archive(buffer, directory, segment_bytes=40 * 12, chunk_bytes=16 * 12)
+            self.assertEqual(archive.lag, 0)
+            buffer.append(data[10:45])
+            self.assertEqual(archive.lag, 35)
+            self.assertEqual(archive.flush(), 35)
+            self.assertEqual(archive.flush(), 0)
+            buffer.append(data[45:90])
+            self.assertEqual(archive.flush(), 45)
+            archive.stop()
+            segments = open_segments(directory)
+            self.assertEqual([first for first, segment in segments], [10, 50])
+            self.assertEqual([segment.shape for first, segment in segments], [(40, 3), (40, 3)])
+            assert_array_equal(concatenate([segment for first, segment in segments]), data[10:90])
+            # points overwritten before they were written are skipped
+            buffer.append(data[90:250])
+            self.assertEqual(archive.flush(), 50)
+            self.assertEqual(archive.lost, 110)
+            archive.close()
+            segments = open_segments(directory)[2:]
+            self.assertEqual([first for first, segment in segments], [200, 240])
+            assert_array_equal(concatenate([segment for first, segment in segments]), data[200:250])
+
+    def test_thread(self):
+        from ..archive import Archive, open_segments
+        from ..circular_buffer import CircularBuffer
+        from tempfile import TemporaryDirectory
+        from numpy import arange, concatenate
+        from time import sleep
+        data = arange(5000.0).reshape(2500, 2)
+        buffer = CircularBuffer(shape=(1000, 2))
+        with TemporaryDirectory() as directory:
+            archive = Archive(buffer, directory, segment_bytes=2**12, interval=0.001)
+            archive.start()
+            for i in range(0, 2500, 100):
+                buffer.append(data[i:i+100])
+                sleep(0.002)
+            archive.stop()
+            self.assertEqual(archive.lag, 0)
+            self.assertEqual(archive.lost, 0)
+            assert_array_equal(concatenate([segment for first, segment in open_segments(directory)]), data)
+
+    def test_lapped(self):
+        from ..archive import Archive, open_segments
+        from ..circular_buffer import CircularBuffer
+        from tempfile import TemporaryDirectory
+        from numpy import arange, concatenate
+        data = arange(100 * 3, dtype='int16').reshape(100, 3)
+        # padded rows
+        buffer = CircularBuffer(shape=(20, 3), dtype='int16', allocation={'align': 64})
+        with TemporaryDirectory() as directory:
+            archive = Archive(buffer, directory, chunk_bytes=8 * 6, start=0)
+            buffer.append(data[:12])
+            archive._open()
+
+            class Lapping(object):
+                """segment file, the buffer is appended to during the first write"""
+                def __init__(self, file):
+                    self.file = file
+                    self.appended = False
+
+                def write(self, data):
+                    self.file.write(data)
+                    if not self.appended:
+                        self.appended = True
+                        buffer.append(data_lapping)
+
+                def __getattr__(self, name):
+                    return getattr(self.file, name)
+            data_lapping = data[12:33]
+            archive.file = Lapping(archive.file)
+            self.assertEqual(archive.flush(), 20)
+            self.assertEqual(archive.lost, 13)
+            archive.stop()
+            segments = open_segments(directory)
+            self.assertEqual([first for first, segment in segments], [13])
+            assert_array_equal(concatenate([segment for first, segment in segments]), data[13:33])
@@ -0,0 +1,57 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""test BitBuffer
+    by Valentyn Stadnytskyi
+    created: October, 2026
+
+    to run unittest: python3 -m unittest test_bit_buffer
+"""
+import unittest
+from numpy.testing import assert_array_equal
+
+
+class BitBufferTest(unittest.TestCase):
+    def test_append(self):
+        from ..bit_buffer import BitBuffer
+        from numpy import random, packbits, int64
+        data = random.random((300, 11)) > 0.5
+        buffer = BitBuffer(length=64, lines=11)
+        self.assertEqual(buffer.buffer.nbytes, 11*8)
+        buffer.append(data[:5])
+        assert_array_equal(buffer.get_last_N(5), data[:5])
+        i = 5
+        for n in [1, 3, 8, 13, 7, 64, 30, 70, 2]:
+            buffer.append(data[i:i+n])
+            i += n
+            assert_array_equal(buffer.get_last_N(min(i, 64)), data[max(0, i-64):i])
+        self.assertEqual(buffer.g_pointer, i - 1)
+        assert_array_equal(buffer.get_N_global(10, i - 20), data[i-29:i-19])
+        assert_array_equal(buffer.get_last_N(21, packed=True), packbits(data[i-21:i], axis=0).T)
+        assert_array_equal(buffer.get_N_global(13, buffer.g_pointer - buffer.pointer % 8 + 7 - 8, packed=True),
+                           packbits(data[i - buffer.pointer % 8 - 14:i - buffer.pointer % 8 - 1], axis=0).T)
+        # numpy integers, the first sample starts a byte
+        M = buffer.g_pointer - (buffer.g_pointer - 12) % 8
+        assert_array_equal(buffer.get_N_global(int64(13), int64(M), packed=True),
+                           packbits(data[M - 12:M + 1], axis=0).T)
+        buffer.append(data[i])
+        assert_array_equal(buffer.get_last_N(1), data[i:i+1])
+        with self.assertRaises(Exception):
+            buffer.get_last_N(65)
+        with self.assertRaises(Exception):
+            BitBuffer(length=10)
+
+    def test_edges(self):
+        from ..bit_buffer import BitBuffer
+        from numpy import random, diff, flatnonzero
+        data = random.random((1000, 3)) > 0.7
+        buffer = BitBuffer(length=256, lines=3)
+        buffer.append(data)
+        for N, M in [(256, 999), (100, 999), (37, 900), (2, 990), (1, 999)]:
+            window = data[M-N+1:M+1].astype('int8')
+            steps = diff(window, axis=0)
+            assert_array_equal(buffer.count_edges(N, M, 'rising'), (steps == 1).sum(axis=0))
+            assert_array_equal(buffer.count_edges(N, M, 'falling'), (steps == -1).sum(axis=0))
+            assert_array_equal(buffer.count_edges(N, M), (steps != 0).sum(axis=0))
+            assert_array_equal(buffer.find_edges(1, N, M, 'rising'), M - N + 2 + flatnonzero(steps[:, 1] == 1))
+        with self.assertRaises(Exception):
+            buffer.count_edges(10, kind='up')
@@ -171,3 +171,434 @@ class CircularBufferTest(unittest.TestCase):
                     self.assertEqual(buffer.get_packet_linear_i_j(i-10,i-8).mean(),i-9)
                     self.assertEqual(buffer.get_packet_linear_i_j(i-10,i-7).mean(),(i-10+i-7)/2)
                     self.assertEqual(buffer.get_packet_linear_i_j(i-10,i-7, copy=True).mean(),(i-10+i-7)/2)
+
+    def test_reserve_commit(self):
+        from ..circular_buffer import CircularBuffer
+        from numpy import arange
+        buffer = CircularBuffer(shape=(10, 2), dtype='int64')
+        segments = buffer.reserve(6)
+        self.assertEqual(len(segments), 1)
+        segments[0][:] = arange(12).reshape(6, 2)
+        self.assertEqual(buffer.pointer, -1)
+        buffer.commit(6)
+        self.assertEqual(buffer.pointer, 5)
+        self.assertEqual(buffer.g_pointer, 5)
+        assert_array_equal(buffer.get_last_N(6), arange(12).reshape(6, 2))
+
+        # the reserved slots wrap around the end of the buffer
+        segments = buffer.reserve(6)
+        self.assertEqual([len(segment) for segment in segments], [4, 2])
+        for segment in segments:
+            segment[:] = -1
+        buffer.commit(6)
+        self.assertEqual(buffer.pointer, 1)
+        self.assertEqual(buffer.g_pointer, 11)
+        assert_array_equal(buffer.get_last_N(6), -1)
+        with self.assertRaises(Exception):
+            buffer.reserve(11)
+
+    def test_append_longer_than_buffer(self):
+        from ..circular_buffer import CircularBuffer
+        from numpy import arange
+        buffer = CircularBuffer(shape=(10, 2, 3), dtype='int64')
+        data = arange(25*6).reshape(25, 2, 3)
+        buffer.append(data[0])
+        self.assertEqual(buffer.g_pointer, 0)
+        buffer.append(data)
+        self.assertEqual(buffer.g_pointer, 25)
+        self.assertEqual(buffer.pointer, 5)
+        assert_array_equal(buffer.get_last_N(10), data[-10:])
+        assert_array_equal(buffer.get_N_global(3, 24), data[-4:-1])
+
+    def test_append_from(self):
+        from ..circular_buffer import CircularBuffer
+        from numpy import arange
+        from io import BytesIO
+        buffer = CircularBuffer(shape=(10, 3), dtype='<i2')
+        data = arange(45, dtype='<i2').reshape(15, 3)
+        stream = BytesIO(data[:7].tobytes())
+        self.assertEqual(buffer.append_from(stream, 7), 7)
+        self.assertEqual(buffer.pointer, 6)
+        self.assertEqual(buffer.g_pointer, 6)
+        assert_array_equal(buffer.get_data(), data[:7])
+
+        # the read is split at the end of the buffer, the stream ends after 8 points
+        # and the trailing incomplete point does not touch the points in the buffer.
+        stream = BytesIO(data[7:].tobytes() + b'\x01')
+        self.assertEqual(buffer.append_from(stream, 9), 8)
+        self.assertEqual(buffer.pointer, 4)
+        self.assertEqual(buffer.g_pointer, 14)
+        assert_array_equal(buffer.get_data(), data[5:])
+
+    def test_lease_drop_spill(self):
+        from ..circular_buffer import CircularBuffer
+        from numpy import arange
+        data = arange(40).reshape(20, 2)
+        buffer = CircularBuffer(shape=(10, 2), dtype='int64', lease_policy='drop')
+        buffer.append(data[:10])
+        lease = buffer.lease(3, M=4)
+        self.assertEqual((lease.start, lease.stop), (2, 4))
+        # points 0 and 1 are not pinned and can be overwritten
+        buffer.append(data[10:12])
+        self.assertEqual(buffer.g_pointer, 11)
+        buffer.append(data[12:13])
+        self.assertEqual(buffer.g_pointer, 11)
+        self.assertEqual(buffer.dropped, 1)
+        assert_array_equal(lease.data, data[2:5])
+        buffer.release(lease)
+        self.assertEqual(buffer.lease_stats['count'], 1)
+        buffer.append(data[12:13])
+        self.assertEqual(buffer.g_pointer, 12)
+
+        buffer = CircularBuffer(shape=(10, 2), dtype='int64', lease_policy='spill')
+        buffer.append(data[:10])
+        with buffer.lease(2, M=1) as lease:
+            buffer.append(data[10:13])
+            buffer.append(data[13:14])
+            self.assertEqual(buffer.g_pointer, 9)
+            self.assertEqual(len(buffer.spill), 2)
+            assert_array_equal(lease.data, data[:2])
+        self.assertEqual(buffer.g_pointer, 13)
+        self.assertEqual(buffer.spill, [])
+        assert_array_equal(buffer.get_data(), data[4:14])
+        with self.assertRaises(Exception):
+            buffer.lease(2, M=3)
+
+    def test_append_from_drop_spill(self):
+        from ..circular_buffer import CircularBuffer
+        from numpy import arange
+        from io import BytesIO
+        data = arange(40).reshape(20, 2)
+        buffer = CircularBuffer(shape=(10, 2), dtype='int64', lease_policy='drop')
+        buffer.append(data[:10])
+        with buffer.lease(3, M=4):
+            self.assertEqual(buffer.append_from(BytesIO(data[10:13].tobytes()), 3), 3)
+            self.assertEqual(buffer.g_pointer, 9)
+            self.assertEqual(buffer.dropped, 3)
+
+        buffer = CircularBuffer(shape=(10, 2), dtype='int64', lease_policy='spill')
+        buffer.append(data[:10])
+        with buffer.lease(2, M=1):
+            self.assertEqual(buffer.append_from(BytesIO(data[10:13].tobytes()), 3), 3)
+            self.assertEqual(len(buffer.spill), 1)
+            with self.assertRaises(Exception):
+                buffer.reserve(1)
+            # the spilled points come first, the next points are spilled after them
+            self.assertEqual(buffer.append_from(BytesIO(data[13:14].tobytes()), 1), 1)
+            self.assertEqual(len(buffer.spill), 2)
+        assert_array_equal(buffer.get_data(), data[4:14])
+
+    def test_lease_block(self):
+        from ..circular_buffer import CircularBuffer
+        from numpy import arange
+        from threading import Thread
+        from time import sleep
+        data = arange(40).reshape(20, 2)
+        buffer = CircularBuffer(shape=(10, 2), dtype='int64')
+        buffer.append(data[:10])
+        lease = buffer.lease(5)
+        thread = Thread(target=buffer.append, args=(data[10:16],))
+        thread.start()
+        sleep(0.05)
+        self.assertEqual(buffer.g_pointer, 9)
+        assert_array_equal(lease.data, data[5:10])
+        buffer.release(lease)
+        thread.join()
+        self.assertEqual(buffer.g_pointer, 15)
+        self.assertGreater(buffer.lease_stats['max_time'], 0.04)
+
+    def test_consistent_read(self):
+        from ..circular_buffer import CircularBuffer
+        from numpy import arange, ones, diff, all
+        from threading import Thread
+        from time import time
+        buffer = CircularBuffer(shape=(16, 8), dtype='int64')
+        buffer.append(arange(16).reshape(16, 1) * ones((1, 8), dtype='int64'))
+        def writer():
+            for i in range(16, 5000):
+                buffer.append(ones((1, 8), dtype='int64') * i)
+        thread = Thread(target=writer)
+        thread.start()
+        while thread.is_alive():
+            data = buffer.get_last_N_consistent(10)
+            self.assertTrue(all(data == data[:, :1]))
+            self.assertTrue(all(diff(data[:, 0]) == 1))
+            M = buffer.g_pointer
+            data = buffer.get_N_global_consistent(4, M)
+            self.assertTrue(all(data == data[:, :1]))
+        thread.join()
+        self.assertEqual(buffer.sequence % 2, 0)
+        # the skip of a long append and the write of its last points are one write
+        sequences = []
+        reserve = buffer._reserve
+        def recording(n):
+            sequences.append((buffer.sequence, buffer.g_pointer))
+            return reserve(n)
+        buffer._reserve = recording
+        sequence = buffer.sequence
+        buffer.append(arange(40 * 8).reshape(40, 8))
+        self.assertEqual(sequences, [(sequence + 1, 4999 + 24)])
+        self.assertEqual(buffer.sequence, sequence + 2)
+        # a write that never ends, the read gives up after the timeout
+        buffer.sequence += 1
+        t = time()
+        with self.assertRaises(Exception):
+            buffer.get_last_N_consistent(10, timeout=0.05)
+        self.assertLess(time() - t, 1.0)
+
+    def test_cache(self):
+        from ..circular_buffer import CircularBuffer
+        from numpy import arange
+        data = arange(30).reshape(15, 2)
+        buffer = CircularBuffer(shape=(10, 2), dtype='int64', cache=True)
+        buffer.append(data[:4])
+        snapshot = buffer.get_data()
+        self.assertIs(buffer.get_data(), snapshot)
+        self.assertFalse(snapshot.flags.writeable)
+        assert_array_equal(snapshot, data[:4])
+        buffer.append(data[4:])
+        assert_array_equal(snapshot, data[:4])
+        all = buffer.get_all()
+        self.assertIs(buffer.get_data(), all)
+        assert_array_equal(all, data[5:])
+        buffer.reset()
+        buffer.append(data[:1])
+        buffer.reset()
+        buffer.append(data[1:2])
+        assert_array_equal(buffer.get_data(), data[1:2])
+        buffer = CircularBuffer(shape=(10, 2), dtype='int64')
+        buffer.append(data[:4])
+        self.assertTrue(buffer.get_data().flags.writeable)
+
+    def test_snapshot(self):
+        from ..circular_buffer import CircularBuffer
+        from numpy import arange
+        import gc
+        data = arange(200).reshape(50, 4)
+        buffer = CircularBuffer(shape=(10, 4), dtype='int64')
+        empty = buffer.snapshot()
+        self.assertEqual(empty.get_data().shape, (0, 4))
+        buffer.append(data[:13])
+        self.assertEqual(buffer.snapshot_segment, 10)
+        with buffer.snapshot() as snap:
+            self.assertEqual(snap.saved, {})
+            buffer.append(data[13:16])
+            self.assertEqual(len(snap.saved), 1)
+            buffer.append(data[16:50])
+            assert_array_equal(snap.get_data(), data[3:13])
+            assert_array_equal(snap.get_last_N(2), data[11:13])
+            assert_array_equal(buffer.get_data(), data[40:50])
+        self.assertEqual(snap.segments, 0)
+        del empty
+        gc.collect()
+        buffer.append(data[:1])
+        self.assertEqual(buffer.snapshots, [])
+
+    def test_snapshot_reset_load(self):
+        from ..circular_buffer import CircularBuffer
+        from numpy import arange, concatenate
+        from tempfile import TemporaryDirectory
+        from os.path import join
+        data = arange(80.0).reshape(20, 4)
+        buffer = CircularBuffer(shape=(10, 4))
+        buffer.append(data[:13])
+        snap = buffer.snapshot()
+        buffer.reset(clear=True)
+        assert_array_equal(snap.get_data(), data[3:13])
+        with TemporaryDirectory() as directory:
+            path = join(directory, 'buffer.npy')
+            other = CircularBuffer(shape=(10, 4))
+            other.append(data[10:20])
+            other.save(path)
+            buffer.append(data[:13])
+            snap = buffer.snapshot()
+            buffer.load(path)
+            assert_array_equal(snap.get_data(), data[3:13])
+            assert_array_equal(buffer.get_data(), data[10:20])
+        # the snapshot keeps the length of the array it was taken of
+        buffer.append(data[:3])
+        snap = buffer.snapshot()
+        buffer.change_length(15)
+        assert_array_equal(snap.get_last_N(10), concatenate([data[13:20], data[:3]]))
+
+    def test_snapshot_segments(self):
+        from ..circular_buffer import CircularBuffer
+        from numpy import arange
+        data = arange(2**17 * 4, dtype='int64').reshape(2**17, 4)
+        buffer = CircularBuffer(shape=(2**16, 4), dtype='int64')
+        buffer.append(data[:2**16 + 5])
+        self.assertEqual(buffer.snapshot_segment, 2**15)
+        first = buffer.snapshot()
+        buffer.append(data[2**16 + 5: 2**16 + 10])
+        second = buffer.snapshot()
+        buffer.append(data[2**16 + 10:])
+        self.assertIs(first.saved[1], second.saved[1])
+        assert_array_equal(first.get_data(), data[5:2**16 + 5])
+        assert_array_equal(second.get_data(), data[10:2**16 + 10])
+
+    def test_ttl(self):
+        from ..circular_buffer import CircularBuffer
+        from numpy import arange
+        from time import sleep
+        data = arange(60).reshape(30, 2)
+        buffer = CircularBuffer(shape=(10, 2), dtype='int64', ttl=0.2)
+        self.assertEqual(buffer.valid_length, 0)
+        buffer.append(data[:4])
+        self.assertEqual(buffer.valid_length, 4)
+        sleep(0.3)
+        self.assertEqual(buffer.valid_length, 0)
+        self.assertEqual(buffer.get_data().shape, (0, 2))
+        buffer.append(data[4:17])
+        sleep(0.3)
+        buffer.append(data[17:20])
+        self.assertEqual(buffer.valid_length, 3)
+        assert_array_equal(buffer.get_data(), data[17:20])
+        buffer.append(data[20:28])
+        self.assertEqual(buffer.valid_length, 10)
+        assert_array_equal(buffer.get_data(), data[18:28])
+
+    def test_validity(self):
+        from ..circular_buffer import CircularBuffer
+        from numpy import arange, array
+        data = arange(60, dtype='int16').reshape(30, 2)
+        buffer = CircularBuffer(shape=(10, 2), dtype='int16', validity=True)
+        self.assertEqual(buffer.valid.nbytes, 2)
+        buffer.append(data[:6])
+        buffer.append(data[6:9], valid=array([True, False, True]))
+        buffer.append(data[9:12], valid=False)
+        assert_array_equal(buffer.get_valid(10), [True]*4 + [True, False, True] + [False]*3)
+        assert_array_equal(buffer.get_valid(2, M=11), [False]*2)
+        buffer.invalidate(2, M=4)
+        mask = buffer.get_valid(10)
+        assert_array_equal(mask, [True, False, False, True, True, False, True] + [False]*3)
+        assert_array_equal(buffer.get_last_N(10)[mask], data[[2, 5, 6, 8]])
+        buffer.append(data[12:27], valid=array([False]*13 + [True]*2))
+        assert_array_equal(buffer.get_valid(10), [False]*8 + [True]*2)
+        with self.assertRaises(Exception):
+            buffer.invalidate(1, M=5)
+        buffer.reset(clear=True)
+        assert_array_equal(buffer.valid, [0, 0])
+        assert_array_equal(buffer.buffer[6], data[26])
+        with self.assertRaises(Exception):
+            CircularBuffer(shape=(10, 2)).get_valid(1)
+
+    def test_deadband(self):
+        from ..circular_buffer import CircularBuffer
+        from numpy import array, arange, nan
+        data = array([[0.0, 10.0], [0.05, 10.0], [0.2, 10.0], [0.2, 10.5], [0.2, 12.0],
+                      [0.1, 12.0], [0.1, 12.0], [0.1, nan], [0.1, nan], [0.5, nan]])
+        buffer = CircularBuffer(shape=(4, 2), deadband=[0.1, 0.0], deadband_relative=[0.0, 0.1])
+        buffer.append(data[:6])
+        self.assertEqual(buffer.g_input, 5)
+        self.assertEqual(buffer.g_pointer, 2)
+        assert_array_equal(buffer.get_data(), data[[0, 2, 4]])
+        assert_array_equal(buffer.get_indices(3), [0, 2, 4])
+        for point in data[6:]:
+            buffer.append(point)
+        self.assertEqual(buffer.g_input, 9)
+        assert_array_equal(buffer.get_indices(4), [2, 4, 7, 9])
+        assert_array_equal(buffer.get_step_series(3, 9), data[[2, 4, 4, 4, 7, 7, 9]])
+        with self.assertRaises(Exception):
+            buffer.get_step_series(1, 5)
+        buffer.change_length(3)
+        assert_array_equal(buffer.get_indices(3), [4, 7, 9])
+        buffer.reset()
+        buffer.append(data[:2])
+        assert_array_equal(buffer.get_indices(1), [0])
+        # without a deadband every point is stored
+        buffer = CircularBuffer(shape=(4, 2), deadband=0)
+        buffer.append(arange(20.0).reshape(10, 2))
+        assert_array_equal(buffer.get_indices(4), [6, 7, 8, 9])
+
+    def test_deadband_scaling(self):
+        from ..circular_buffer import CircularBuffer
+        from numpy import random, abs
+        from time import perf_counter
+        # the points stored across many windows are the ones a point by point loop stores
+        data = random.RandomState(0).normal(size=(2000, 2)).cumsum(axis=0)
+        buffer = CircularBuffer(shape=(2000, 2), deadband=2.0)
+        buffer.append(data)
+        stored, reference = [0], data[0]
+        for i in range(1, data.shape[0]):
+            if (abs(data[i] - reference) > 2.0).any():
+                stored.append(i)
+                reference = data[i]
+        assert_array_equal(buffer.get_indices(len(stored)), stored)
+        # the cost grows linearly with the number of offered points
+        timing = []
+        for n in (10**4, 4 * 10**4):
+            data = random.RandomState(0).normal(size=(n, 2)).cumsum(axis=0)
+            best = None
+            for repeat in range(3):
+                buffer = CircularBuffer(shape=(n, 2), deadband=2.0)
+                t = perf_counter()
+                buffer.append(data)
+                t = perf_counter() - t
+                best = t if best is None else min(best, t)
+            timing.append(best)
+        self.assertLess(timing[1], 8 * timing[0])
+
+    def test_save_load(self):
+        from ..circular_buffer import CircularBuffer
+        from numpy import arange, array
+        from tempfile import TemporaryDirectory
+        from os.path import join
+        data = arange(60.0).reshape(30, 2)
+        buffer = CircularBuffer(shape=(10, 2), validity=True, ttl=100.0)
+        buffer.append(data[:17], valid=arange(17) % 3 > 0)
+        with TemporaryDirectory() as directory:
+            path = join(directory, 'buffer.npy')
+            buffer.save(path)
+            restored = CircularBuffer(shape=(10, 2), validity=True, ttl=100.0)
+            restored.load(path)
+            self.assertEqual((restored.pointer, restored.g_pointer), (buffer.pointer, buffer.g_pointer))
+            assert_array_equal(restored.buffer, buffer.buffer)
+            assert_array_equal(restored.get_valid(10), buffer.get_valid(10))
+            self.assertEqual(restored.valid_length, 10)
+            restored.append(data[17:20])
+            assert_array_equal(restored.get_N_global(10, 19), data[10:20])
+            # a shorter buffer keeps the newest points
+            shorter = CircularBuffer(shape=(4, 2))
+            shorter.load(path)
+            self.assertEqual(shorter.g_pointer, 16)
+            assert_array_equal(shorter.get_data(), data[13:17])
+            # a buffer that is not full yet
+            buffer = CircularBuffer(shape=(10, 2), deadband=1.0)
+            buffer.append(array([0.0, 0.5, 2.0, 2.5, 4.0]).repeat(2).reshape(5, 2))
+            buffer.save(path)
+            restored = CircularBuffer(shape=(10, 2), deadband=1.0)
+            restored.load(path)
+            assert_array_equal(restored.get_data(), buffer.get_data())
+            assert_array_equal(restored.get_indices(3), [0, 2, 4])
+            restored.append(array([4.5, 4.5]))
+            self.assertEqual((restored.g_pointer, restored.g_input), (2, 5))
+            with self.assertRaises(Exception):
+                CircularBuffer(shape=(10, 3)).load(path)
+
+    def test_save_load_aligned(self):
+        from ..circular_buffer import CircularBuffer
+        from .. import persist
+        from numpy import arange
+        from tempfile import TemporaryDirectory
+        from os.path import join
+        data = arange(90.0).reshape(30, 3)
+        chunk_bytes = persist.CHUNK_BYTES
+        persist.CHUNK_BYTES = 4 * 24
+        try:
+            with TemporaryDirectory() as directory:
+                path = join(directory, 'buffer.npy')
+                # padded rows, saved and loaded in chunks of 4 points
+                aligned = CircularBuffer(shape=(10, 3), allocation={'align': 64})
+                self.assertFalse(aligned.buffer.flags.c_contiguous)
+                aligned.append(data[:17])
+                aligned.save(path)
+                plain = CircularBuffer(shape=(10, 3))
+                plain.load(path)
+                assert_array_equal(plain.get_data(), data[7:17])
+                plain.append(data[17:23])
+                plain.save(path)
+                aligned = CircularBuffer(shape=(10, 3), allocation={'align': 64})
+                aligned.load(path)
+                assert_array_equal(aligned.get_data(), data[13:23])
+        finally:
+            persist.CHUNK_BYTES = chunk_bytes
@@ -0,0 +1,73 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""test CompressedCircularBuffer
+    by Valentyn Stadnytskyi
+    created: October, 2026
+
+    to run unittest: python3 -m unittest test_compressed
+"""
+import unittest
+from numpy.testing import assert_array_equal
+
+
+class CompressedTest(unittest.TestCase):
+    def test_encode_decode(self):
+        from ..compressed import encode, decode
+        from numpy import array
+        x = array([0, 1, 2**63, 0, 2**64 - 1, 0x00f0000000000000, 0], dtype='uint64')
+        assert_array_equal(decode(*encode(x), count=7, dtype=x.dtype), x)
+        x = array([0, 3, 255, 128], dtype='uint8')
+        assert_array_equal(decode(*encode(x), count=4, dtype=x.dtype), x)
+
+    def test_round_trip(self):
+        from ..compressed import CompressedCircularBuffer
+        from numpy import random, round, nan, cumsum
+        data = round(20 + cumsum(random.normal(0, 0.01, size=(1000, 3)), axis=0), 2)
+        data[5, 1] = nan
+        data[6, 2] = -0.0
+        buffer = CompressedCircularBuffer(max_bytes=2**20, data_shape=(3,), block_length=64)
+        buffer.append(data[:500])
+        for i in range(500, 1000):
+            buffer.append(data[i])
+        self.assertEqual(buffer.g_pointer, 999)
+        self.assertEqual(len(buffer.blocks), 15)
+        self.assertEqual(buffer.get_data().view('uint64').tolist(), data.view('uint64').tolist())
+        assert_array_equal(buffer.get_N_global(100, 150), data[51:151])
+        assert_array_equal(buffer.get_last_N(50), data[-50:])
+        self.assertEqual(buffer.get_last_N(0).shape, (0, 3))
+        with self.assertRaises(Exception):
+            buffer.get_N_global(2, 1000)
+
+    def test_eviction(self):
+        from ..compressed import CompressedCircularBuffer
+        from numpy import ones, arange
+        data = ones((10000, 4)) * 21.5
+        data[::100, 0] = arange(100)
+        buffer = CompressedCircularBuffer(max_bytes=8*4*1000, data_shape=(4,), block_length=256)
+        buffer.append(data)
+        self.assertLessEqual(buffer.nbytes, buffer.max_bytes)
+        self.assertEqual(buffer.length, 10000)
+        self.assertGreater(buffer.ratio, 10)
+        buffer.append(data)
+        buffer.append(data)
+        self.assertLessEqual(buffer.nbytes, buffer.max_bytes)
+        self.assertLess(buffer.length, 30000)
+        expected = data[-buffer.length % 10000:].tolist() + data.tolist() * (buffer.length // 10000)
+        assert_array_equal(buffer.get_data(), expected)
+        with self.assertRaises(Exception):
+            buffer.get_N_global(1, buffer.first - 1)
+
+    def test_timestamps(self):
+        from ..compressed import CompressedCircularBuffer
+        from numpy import arange, zeros
+        t = arange(1000, dtype='int64') * 1000000 + 1700000000000000000
+        t[500] += 7
+        t[501] -= 3
+        buffer = CompressedCircularBuffer(data_shape=(2,), block_length=100, timestamps=True)
+        buffer.append(zeros((1000, 2)), t)
+        timestamps, data = buffer.get_N_global(300, 599, timestamps=True)
+        assert_array_equal(timestamps, t[300:600])
+        self.assertEqual(data.shape, (300, 2))
+        self.assertGreater(buffer.ratio, 15)
+        with self.assertRaises(Exception):
+            buffer.append(zeros((1, 2)))
@@ -0,0 +1,125 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""test Ingest
+    by Valentyn Stadnytskyi
+    created: October, 2026
+
+    to run unittest: python3 -m unittest test_ingest
+"""
+import unittest
+from numpy.testing import assert_array_equal
+
+
+class IngestTest(unittest.TestCase):
+    def test_tcp(self):
+        from ..circular_buffer import CircularBuffer
+        from ..ingest import Ingest
+        from numpy import arange
+        from socket import socketpair
+        buffer = CircularBuffer(shape=(16, 4), dtype='<i2')
+        data = arange(40*4, dtype='<i2').reshape(40, 4)
+        sender, receiver = socketpair()
+        ingest = Ingest(buffer, receiver, nrows=4)
+        ingest.start()
+        sender.sendall(data.tobytes())
+        sender.close()
+        ingest.thread.join(5)
+        self.assertEqual(ingest.running, False)
+        self.assertEqual(ingest.count, 40)
+        self.assertEqual(buffer.g_pointer, 39)
+        assert_array_equal(buffer.get_data(), data[-16:])
+        receiver.close()
+
+    def test_udp(self):
+        from ..circular_buffer import CircularBuffer
+        from ..ingest import Ingest
+        from numpy import arange
+        from socket import socket, AF_INET, SOCK_DGRAM
+        from time import sleep, time
+        buffer = CircularBuffer(shape=(10, 2, 3), dtype='<f4')
+        data = arange(12*6, dtype='<f4').reshape(12, 2, 3)
+        receiver = socket(AF_INET, SOCK_DGRAM)
+        receiver.bind(('127.0.0.1', 0))
+        sender = socket(AF_INET, SOCK_DGRAM)
+        ingest = Ingest(buffer, receiver, nrows=3)
+        ingest.start()
+        for i in range(4):
+            sender.sendto(data[i*3:(i+1)*3].tobytes(), receiver.getsockname())
+        t = time()
+        while ingest.count < 12 and time() - t < 5:
+            sleep(0.01)
+        ingest.stop()
+        self.assertEqual(ingest.count, 12)
+        assert_array_equal(buffer.get_data(), data[-10:])
+        sender.close()
+        receiver.close()
+
+    def test_datagram_wrap(self):
+        """
+        a datagram that wraps around the end of the buffer is received into
+        both segments and is not mixed with the next datagram.
+        """
+        from ..circular_buffer import CircularBuffer
+        from numpy import array, arange
+        from socket import socket, AF_INET, SOCK_DGRAM
+        buffer = CircularBuffer(shape=(10, 1), dtype='<i4')
+        receiver = socket(AF_INET, SOCK_DGRAM)
+        receiver.bind(('127.0.0.1', 0))
+        receiver.settimeout(5)
+        sender = socket(AF_INET, SOCK_DGRAM)
+        buffer.append(arange(8).reshape(8, 1))
+        sender.sendto(array([0, 1, 2], dtype='<i4').tobytes(), receiver.getsockname())
+        sender.sendto(array([100, 101, 102], dtype='<i4').tobytes(), receiver.getsockname())
+        self.assertEqual(buffer.append_from(receiver, 3), 3)
+        self.assertEqual(buffer.append_from(receiver, 3), 3)
+        assert_array_equal(buffer.get_last_N(6)[:, 0], [0, 1, 2, 100, 101, 102])
+        # a datagram larger than nrows points is cut to nrows points
+        sender.sendto(array([7, 8, 9], dtype='<i4').tobytes(), receiver.getsockname())
+        self.assertEqual(buffer.append_from(receiver, 2), 2)
+        assert_array_equal(buffer.get_last_N(3)[:, 0], [102, 7, 8])
+        sender.close()
+        receiver.close()
+
+    def test_stream_partial_point(self):
+        """
+        a point that arrives in pieces is assembled outside of the buffer.
+        """
+        from ..circular_buffer import CircularBuffer
+        from numpy import arange
+        from socket import socketpair, timeout
+        buffer = CircularBuffer(shape=(4, 2), dtype='<i4')
+        data = arange(12, dtype='<i4').reshape(6, 2)
+        buffer.append(data[:4] + 100)
+        sender, receiver = socketpair()
+        receiver.settimeout(0.05)
+        raw = data.tobytes()
+        sender.sendall(raw[:12])
+        # one and a half points arrived: the complete point is appended,
+        # the half point waits outside of the buffer.
+        with self.assertRaises(timeout):
+            buffer.append_from(receiver, 2)
+        self.assertEqual(buffer.g_pointer, 4)
+        assert_array_equal(buffer.get_data(), [[102, 103], [104, 105], [106, 107], [0, 1]])
+        sender.sendall(raw[12:])
+        self.assertEqual(buffer.append_from(receiver, 2), 2)
+        assert_array_equal(buffer.get_last_N(3), data[:3])
+        sender.close()
+        self.assertEqual(buffer.append_from(receiver, 4), 3)
+        assert_array_equal(buffer.get_data(), data[2:])
+        receiver.close()
+
+    def test_pipe(self):
+        """
+        sources that cannot report the available bytes are read through a temporary array.
+        """
+        from ..circular_buffer import CircularBuffer
+        from numpy import arange
+        from os import pipe, fdopen
+        buffer = CircularBuffer(shape=(10, 2), dtype='<i2')
+        data = arange(10, dtype='<i2').reshape(5, 2)
+        r, w = pipe()
+        with fdopen(w, 'wb') as writer:
+            writer.write(data.tobytes() + b'\x01')
+        with fdopen(r, 'rb', buffering=0) as reader:
+            self.assertEqual(buffer.append_from(reader, 8), 5)
+        assert_array_equal(buffer.get_data(), data)
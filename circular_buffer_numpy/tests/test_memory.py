@@ -0,0 +1,105 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""test memory
+    by Valentyn Stadnytskyi
+    created: October, 2026
+
+    to run unittest: python3 -m unittest test_memory
+"""
+import unittest
+from numpy.testing import assert_array_equal
+
+
+class MemoryTest(unittest.TestCase):
+    def test_allocate(self):
+        from .. import memory
+        from numpy import isnan, all
+        self.assertEqual(memory.allocate((10, 3), 'int16').sum(), 0)
+        chunk_bytes = memory.CHUNK_BYTES
+        memory.CHUNK_BYTES = 64
+        try:
+            array = memory.allocate((100, 3), 'float64', memory.missing_value('float64'), threads=4)
+            self.assertTrue(all(isnan(array)))
+            memory.fill_array(array, 1.0)
+            self.assertEqual(array.sum(), 300)
+        finally:
+            memory.CHUNK_BYTES = chunk_bytes
+        self.assertEqual(memory.missing_value('int64'), 0)
+
+    def test_queue(self):
+        from ..queue import Queue
+        from numpy import isnan, all
+        queue = Queue(shape=(10, 2), dtype='float32', threads=2)
+        self.assertTrue(all(isnan(queue.buffer)))
+        self.assertEqual(Queue(shape=(10, 2), lazy=True).buffer.sum(), 0)
+        queue.reshape((20, 2))
+        self.assertEqual(queue.shape, (20, 2))
+        self.assertTrue(all(isnan(queue.buffer)))
+
+    def test_circular_buffer_clear(self):
+        from ..circular_buffer import CircularBuffer
+        from numpy import isnan, all, arange
+        buffer = CircularBuffer(shape=(10, 2), dtype='float64')
+        array = buffer.buffer
+        buffer.append(arange(8.0).reshape(4, 2))
+        buffer.reset(clear=True)
+        self.assertIs(buffer.buffer, array)
+        self.assertTrue(all(isnan(buffer.buffer)))
+        buffer = CircularBuffer(shape=(10, 2), dtype='int64')
+        buffer.append(arange(8).reshape(4, 2))
+        buffer.reset(clear=True)
+        self.assertEqual(buffer.buffer.sum(), 0)
+
+    def test_change_length(self):
+        from ..circular_buffer import CircularBuffer
+        from numpy import arange
+        data = arange(60).reshape(30, 2)
+        buffer = CircularBuffer(shape=(10, 2), dtype='int64', validity=True)
+        buffer.append(data[:25], valid=arange(25) != 23)
+        buffer.change_length(4)
+        self.assertEqual(buffer.shape, (4, 2))
+        self.assertEqual(buffer.g_pointer, 24)
+        assert_array_equal(buffer.get_data(), data[21:25])
+        assert_array_equal(buffer.get_N_global(2, 23), data[22:24])
+        assert_array_equal(buffer.get_valid(4), [True, True, False, True])
+        buffer.change_length(12)
+        assert_array_equal(buffer.get_last_N(4), data[21:25])
+        assert_array_equal(buffer.get_valid(12), [False]*8 + [True, True, False, True])
+        buffer.append(data[25:])
+        assert_array_equal(buffer.get_last_N(9), data[21:30])
+        empty = CircularBuffer(shape=(10, 2), ttl=10)
+        empty.change_length(5)
+        self.assertEqual(empty.g_pointer, -1)
+        self.assertEqual(empty.get_data().shape, (0, 2))
+
+    def test_allocate_mapped(self):
+        from .. import memory
+        array = memory.allocate((10, 3), 'float64', 0.0, align=64, hugepages=True, prefault=True, lock=True)
+        self.assertEqual(array.strides, (64, 8))
+        self.assertEqual(array.ctypes.data % 64, 0)
+        self.assertEqual(array[7].ctypes.data % 64, 0)
+        self.assertEqual(array.sum(), 0)
+        array = memory.allocate((4, 2, 3), 'int16', align=64)
+        self.assertEqual(array.strides, (64, 6, 2))
+        self.assertEqual(memory.allocate((4, 8), 'float64', align=64).flags.c_contiguous, True)
+
+    def test_aligned_buffers(self):
+        from ..circular_buffer import CircularBuffer
+        from ..queue import Queue
+        from numpy import arange
+        from io import BytesIO
+        from socket import socketpair, AF_UNIX, SOCK_DGRAM
+        data = arange(60, dtype='int16').reshape(20, 3)
+        buffer = CircularBuffer(shape=(8, 3), dtype='int16', allocation={'align': 64})
+        self.assertFalse(buffer.buffer.flags.c_contiguous)
+        self.assertEqual(buffer.append_from(BytesIO(data[:10].tobytes()), 10), 10)
+        assert_array_equal(buffer.get_data(), data[2:10])
+        sender, receiver = socketpair(AF_UNIX, SOCK_DGRAM)
+        sender.send(data[10:13].tobytes())
+        self.assertEqual(buffer.append_from(receiver, 5), 3)
+        assert_array_equal(buffer.get_data(), data[5:13])
+        buffer.change_length(4)
+        self.assertEqual(buffer.buffer.strides, (64, 2))
+        queue = Queue(shape=(8, 3), dtype='int16', allocation={'align': 64, 'prefault': True})
+        queue.enqueue(data[:5])
+        assert_array_equal(queue.dequeue(5), data[:5])
@@ -0,0 +1,50 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""test QuantizedCircularBuffer
+    by Valentyn Stadnytskyi
+    created: October, 2026
+
+    to run unittest: python3 -m unittest test_quantized
+"""
+import unittest
+from numpy.testing import assert_array_equal, assert_allclose
+
+
+class QuantizedTest(unittest.TestCase):
+    def test_int16(self):
+        from ..quantized import QuantizedCircularBuffer
+        from numpy import linspace, empty, array
+        data = linspace(-10, 10, 60).reshape(20, 3)
+        scale = array([10.0/2**11, 20.0/2**11, 40.0/2**11])
+        buffer = QuantizedCircularBuffer(shape=(8, 3), storage='int16', scale=scale, offset=[0.0, 0.0, 1.0])
+        self.assertEqual(buffer.buffer.dtype, 'int16')
+        buffer.append(data)
+        assert_allclose(buffer.get_data(), data[-8:], atol=scale.max()/2)
+        self.assertEqual(buffer.get_data().dtype, 'float64')
+        out = empty((4, 3))
+        result = buffer.get_last_N(4, out=out)
+        self.assertIs(result, out)
+        assert_allclose(out, data[-4:], atol=scale.max()/2)
+        self.assertEqual(buffer.get_all(out=empty((8, 3))).shape, (8, 3))
+        buffer.append(array([1e9, -1e9, 0.5]))
+        assert_array_equal(buffer.buffer[buffer.pointer], [32767, -32768, -26])
+        self.assertAlmostEqual(float(buffer.get_value(circular_pointer=buffer.pointer)[2]), 0.4921875)
+        lease = buffer.lease(2)
+        self.assertEqual(lease.data.dtype, 'int16')
+        buffer.release(lease)
+        buffer.change_length(4)
+        assert_array_equal(buffer.buffer[buffer.pointer], [32767, -32768, -26])
+
+    def test_float16_and_nan(self):
+        from ..quantized import QuantizedCircularBuffer
+        from numpy import arange, nan
+        data = arange(12.0).reshape(4, 3)
+        data[1, 2] = nan
+        buffer = QuantizedCircularBuffer(shape=(8, 3), storage='float16')
+        buffer.append(data)
+        self.assertEqual(buffer.buffer.nbytes, 8*3*2)
+        assert_array_equal(buffer.get_data(), data)
+        buffer = QuantizedCircularBuffer(shape=(8, 3), storage='int8', validity=True)
+        buffer.append(data)
+        assert_array_equal(buffer.get_valid(4), [True, False, True, True])
+        assert_array_equal(buffer.get_data()[1], [3, 4, 0])
@@ -25,7 +25,7 @@ class QueueTest(unittest.TestCase):
         the freshly created queue has 'rear' value of 0 (the next available pointer in the queue buffer).
         """
         queue = Queue(shape=(100, 2, 2, 2))
-        self.assertEqual(queue.rear, 0)
+        self.assertEqual(queue.rear, 0)
 
     def test_attributes(self):
         """
@@ -231,6 +231,246 @@ class QueueTest(unittest.TestCase):
         self.assertEqual(dequeue_data.shape, data[:3].shape)
         self.assertEqual(std(dequeue_data), std(data[:3]))
 
+    def test_dequeue_batch(self):
+        from numpy import random
+        from time import time
+        queue = Queue(shape=(10, 2), dtype='int16')
+        self.assertEqual(queue.dequeue_batch(max_n=4, max_wait=0.01), None)
+
+        data = random.randint(0, 1024, size=(3, 2))
+        queue.enqueue(data)
+        t = time()
+        arr_out = queue.dequeue_batch(max_n=5, max_wait=0.05)
+        self.assertGreaterEqual(time() - t, 0.04)
+        self.assertEqual((arr_out == data).all(), True)
+        self.assertEqual(queue.length, 0)
+
+        data = random.randint(0, 1024, size=(8, 2))
+        queue.enqueue(data)
+        arr_out = queue.dequeue_batch(max_n=5, max_wait=10)
+        self.assertEqual((arr_out == data[:5]).all(), True)
+        self.assertEqual(queue.length, 3)
+
+        # max_n larger than the queue returns as soon as the queue is full
+        queue.enqueue(random.randint(0, 1024, size=(7, 2)))
+        t = time()
+        arr_out = queue.dequeue_batch(max_n=50, max_wait=10)
+        self.assertLess(time() - t, 5)
+        self.assertEqual(arr_out.shape, (10, 2))
+
+    def test_dequeue_batch_threaded(self):
+        from numpy import zeros
+        from time import sleep, time
+        from threading import Thread
+        queue = Queue(shape=(10, 2), dtype='int16')
+
+        def run(queue):
+            for i in range(4):
+                sleep(0.02)
+                queue.enqueue(zeros((1, 2), dtype='int16') + i)
+        thread = Thread(target=run, args=(queue,))
+        thread.start()
+        t = time()
+        arr_out = queue.dequeue_batch(max_n=4, max_wait=10)
+        thread.join()
+        self.assertLess(time() - t, 5)
+        self.assertEqual(arr_out.shape, (4, 2))
+        self.assertEqual(list(arr_out[:, 0]), [0, 1, 2, 3])
+
+    def test_consumer_groups(self):
+        from numpy import arange
+        queue = Queue(shape=(10, 2), dtype='int16')
+        queue.add_group('archive')
+        queue.add_group('display')
+        data = arange(16).reshape(8, 2)
+        queue.enqueue(data)
+        self.assertEqual(queue.length, 8)
+        self.assertEqual(queue.group_length('archive'), 8)
+
+        arr_out = queue.dequeue_group('archive', 5)
+        self.assertEqual((arr_out == data[:5]).all(), True)
+        # the slowest group still holds all points
+        self.assertEqual(queue.length, 8)
+        self.assertEqual(queue.dequeue_group('archive', 4), None)
+
+        arr_out = queue.dequeue_group('display', 6)
+        self.assertEqual((arr_out == data[:6]).all(), True)
+        self.assertEqual(queue.length, 3)
+        self.assertEqual(queue.isfull, False)
+
+        # wrap around the end of the buffer
+        queue.enqueue(data[:7])
+        self.assertEqual(queue.isfull, True)
+        arr_out = queue.dequeue_group('archive', 10)
+        self.assertEqual((arr_out[:3] == data[5:]).all(), True)
+        self.assertEqual((arr_out[3:] == data[:7]).all(), True)
+
+        queue.seek('archive', 8)
+        self.assertEqual(queue.group_length('archive'), 7)
+        self.assertEqual(queue.length, 9)
+        with self.assertRaises(Exception):
+            queue.seek('archive', 0)
+
+        queue.remove_group('display')
+        self.assertEqual(queue.length, 7)
+
+    def test_consumer_groups_lapped(self):
+        from numpy import arange
+        queue = Queue(shape=(10, 2), dtype='int16')
+        queue.add_group('slow')
+        data = arange(30).reshape(15, 2)
+        queue.enqueue(data)
+        self.assertEqual(queue.group_length('slow'), 10)
+        arr_out = queue.dequeue_group('slow', 10)
+        self.assertEqual((arr_out == data[5:]).all(), True)
+        self.assertEqual(queue.length, 0)
+
+    def test_claim_commit(self):
+        from numpy import arange
+        queue = Queue(shape=(10, 2), dtype='int16')
+        data = arange(20).reshape(10, 2)
+        queue.enqueue(data[:6])
+        self.assertEqual(queue.claim(7), None)
+
+        lease1 = queue.claim(4)
+        lease2 = queue.claim(2)
+        self.assertEqual((lease1.data[0] == data[:4]).all(), True)
+        self.assertEqual((lease2.data[0] == data[4:6]).all(), True)
+        self.assertEqual(queue.length, 6)
+
+        # leased points are not overwritten when the queue is full
+        queue.enqueue(data)
+        self.assertEqual(queue.length, 10)
+        self.assertEqual(queue.dropped, 6)
+        self.assertEqual((lease1.data[0] == data[:4]).all(), True)
+
+        queue.commit(lease2)
+        self.assertEqual(queue.length, 10)
+        queue.commit(lease1)
+        self.assertEqual(queue.length, 4)
+        self.assertEqual(queue.claimed, 0)
+        with self.assertRaises(Exception):
+            queue.commit(lease1)
+
+    def test_claim_partial(self):
+        """
+        leased points are not overwritten when only part of the queue is leased.
+        """
+        from numpy import arange, shares_memory, concatenate
+        queue = Queue(shape=(10, 2), dtype='int16')
+        data = arange(20).reshape(10, 2)
+        queue.enqueue(data)
+        lease = queue.claim(2)
+        queue.enqueue(data[:1] + 100)
+        self.assertEqual(queue.dropped, 1)
+        self.assertEqual((lease.data[0] == data[:2]).all(), True)
+        self.assertEqual((queue.claim(3).data[0] == data[2:5]).all(), True)
+
+        # a claim that wraps around is two views of the buffer, not a copy
+        queue = Queue(shape=(10, 2), dtype='int16')
+        queue.enqueue(data[:7])
+        queue.dequeue(7)
+        queue.enqueue(data[:5])
+        lease = queue.claim(5)
+        self.assertEqual(len(lease.data), 2)
+        for segment in lease.data:
+            self.assertEqual(shares_memory(segment, queue.buffer), True)
+        self.assertEqual((concatenate(lease.data) == data[:5]).all(), True)
+        queue.enqueue(data[4:])
+        self.assertEqual(queue.dropped, 1)
+        self.assertEqual((concatenate(lease.data) == data[:5]).all(), True)
+
+    def test_claim_release(self):
+        from numpy import arange
+        queue = Queue(shape=(10, 2), dtype='int16')
+        data = arange(20).reshape(10, 2)
+        queue.enqueue(data[:8])
+        lease1 = queue.claim(3)
+        lease2 = queue.claim(3)
+        queue.release(lease1)
+        self.assertEqual(lease2.released, True)
+        self.assertEqual(queue.claimed, 0)
+        self.assertEqual(queue.length, 8)
+
+        try:
+            with queue.claim(5) as lease:
+                self.assertEqual((lease.data[0] == data[:5]).all(), True)
+                raise ValueError('processing failed')
+        except ValueError:
+            pass
+        self.assertEqual(queue.length, 8)
+
+        with queue.claim(5) as lease:
+            self.assertEqual((lease.data[0] == data[:5]).all(), True)
+        self.assertEqual(queue.length, 3)
+        self.assertEqual((queue.dequeue(3) == data[5:8]).all(), True)
+
+    def test_reserve_publish(self):
+        from numpy import arange
+        queue = Queue(shape=(10, 2), dtype='int16')
+        data = arange(20).reshape(10, 2)
+        queue.enqueue(data[:7])
+        queue.dequeue(7)
+        segments = queue.reserve(5)
+        self.assertEqual([len(segment) for segment in segments], [3, 2])
+        segments[0][:] = data[:3]
+        segments[1][:] = data[3:5]
+        self.assertEqual(queue.length, 0)
+        queue.publish(5)
+        self.assertEqual(queue.length, 5)
+        self.assertEqual(queue.rear, 2)
+        self.assertEqual(queue.global_rear, 12)
+        self.assertEqual((queue.dequeue(5) == data[:5]).all(), True)
+
+        queue.enqueue(data[:6])
+        lease = queue.claim(2)
+        self.assertEqual(sum(len(segment) for segment in queue.reserve(4)), 4)
+        with self.assertRaises(Exception):
+            queue.reserve(5)
+        queue.commit(lease)
+        self.assertEqual(sum(len(segment) for segment in queue.reserve(10)), 10)
+
+    def test_enqueue_longer_than_queue(self):
+        from numpy import arange
+        queue = Queue(shape=(10, 2), dtype='int16')
+        data = arange(50).reshape(25, 2)
+        queue.enqueue(data)
+        self.assertEqual(queue.length, 10)
+        self.assertEqual(queue.global_rear, 25)
+        self.assertEqual(queue.rear, 5)
+        self.assertEqual((queue.dequeue(10) == data[-10:]).all(), True)
+
+    def test_save_load(self):
+        from numpy import arange
+        from tempfile import TemporaryDirectory
+        from os.path import join
+        queue = Queue(shape=(10, 2), dtype='int16')
+        data = arange(40).reshape(20, 2)
+        queue.enqueue(data[:8])
+        queue.dequeue(5)
+        queue.enqueue(data[8:14])
+        queue.add_group('display')
+        lease = queue.claim(2)
+        with TemporaryDirectory() as directory:
+            path = join(directory, 'queue.npy')
+            queue.save(path)
+            restored = Queue(shape=(10, 2), dtype='int16')
+            restored.load(path)
+            self.assertEqual((restored.rear, restored.length, restored.global_rear), (4, 9, 14))
+            self.assertEqual(restored.groups, {'display': 5})
+            self.assertEqual(restored.claimed, 0)
+            self.assertEqual((restored.dequeue_group('display', 9) == data[5:14]).all(), True)
+            with self.assertRaises(Exception):
+                Queue(shape=(8, 2), dtype='int16').load(path)
+            with self.assertRaises(Exception):
+                Queue(shape=(10, 2), dtype='int32').load(path)
+            # padded rows
+            aligned = Queue(shape=(10, 2), dtype='int16', allocation={'align': 64})
+            aligned.load(path)
+            aligned.save(path)
+            restored.load(path)
+            self.assertEqual((restored.dequeue(9) == data[5:14]).all(), True)
+
     def test_threaded_1(self):
         from numpy import zeros,arange,copy
         from time import sleep
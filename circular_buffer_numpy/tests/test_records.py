@@ -0,0 +1,59 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""test RecordBuffer
+    by Valentyn Stadnytskyi
+    created: October, 2026
+
+    to run unittest: python3 -m unittest test_records
+"""
+import unittest
+from numpy.testing import assert_array_equal
+
+
+class RecordBufferTest(unittest.TestCase):
+    def test_append(self):
+        from ..records import RecordBuffer
+        from numpy import arange, shares_memory
+        buffer = RecordBuffer(nbytes=16, max_records=4)
+        buffer.append(b'abcde')
+        buffer.append(arange(3, dtype='int16'))
+        self.assertEqual(buffer.g_pointer, 1)
+        self.assertEqual(buffer.used, 11)
+        self.assertEqual(buffer.get_bytes(0), b'abcde')
+        assert_array_equal(buffer.get_record(1)[0].view('int16'), [0, 1, 2])
+        # wraps around the end of the byte ring and evicts the first record
+        buffer.append(b'0123456')
+        self.assertEqual(buffer.first, 1)
+        segments = buffer.get_record(2)
+        self.assertEqual([len(segment) for segment in segments], [5, 2])
+        self.assertTrue(shares_memory(segments[0], buffer.buffer))
+        self.assertEqual(buffer.get_bytes(2), b'0123456')
+        with self.assertRaises(Exception):
+            buffer.get_record(0)
+        with self.assertRaises(Exception):
+            buffer.append(b'x' * 17)
+
+    def test_append_many(self):
+        from ..records import RecordBuffer
+        buffer = RecordBuffer(nbytes=64, max_records=8)
+        records = [bytes([i]) * (i % 7 + 1) for i in range(100)]
+        buffer.append_many(b''.join(records[:10]), [len(r) for r in records[:10]])
+        self.assertEqual(buffer.length, 8)
+        self.assertEqual(buffer.first, 2)
+        self.assertEqual([b''.join(s.tobytes() for s in r) for r in buffer.get_last_N(8)], records[2:10])
+        for i in range(10, 100, 3):
+            batch = records[i:i+3]
+            buffer.append_many(b''.join(batch), [len(r) for r in batch])
+            self.assertLessEqual(buffer.used, 64)
+            self.assertLessEqual(buffer.length, 8)
+            for j in range(buffer.first, buffer.g_pointer + 1):
+                self.assertEqual(buffer.get_bytes(j), records[j])
+        # more bytes than the ring: only the last records that fit are kept
+        big = [b'a' * 30, b'b' * 30, b'c' * 30]
+        buffer.append_many(b''.join(big), [30, 30, 30])
+        self.assertEqual(buffer.g_pointer, 102)
+        self.assertEqual(buffer.first, 101)
+        self.assertEqual(buffer.get_bytes(101), b'b' * 30)
+        self.assertEqual(buffer.get_bytes(102), b'c' * 30)
+        with self.assertRaises(Exception):
+            buffer.append_many(b'abc', [1, 1])
@@ -0,0 +1,56 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""test SpillingQueue
+    by Valentyn Stadnytskyi
+    created: October, 2026
+
+    to run unittest: python3 -m unittest test_spilling
+"""
+import unittest
+from numpy.testing import assert_array_equal
+
+
+class SpillingQueueTest(unittest.TestCase):
+    def test_spill(self):
+        from ..spilling import SpillingQueue
+        from numpy import arange, concatenate
+        from os import listdir
+        from tempfile import TemporaryDirectory
+        data = arange(200, dtype='int32').reshape(100, 2)
+        with TemporaryDirectory() as directory:
+            queue = SpillingQueue(shape=(10, 2), dtype='int32', directory=directory, segment_bytes=8*8)
+            queue.enqueue(data[:6])
+            self.assertEqual((queue.length, queue.spilled), (6, 0))
+            self.assertEqual(listdir(directory), [])
+            queue.enqueue(data[6:30])
+            self.assertEqual((queue.length, queue.spilled, queue.backlog), (10, 20, 30))
+            self.assertEqual(len(listdir(directory)), 3)
+            with self.assertRaises(Exception):
+                queue.reserve(1)
+            assert_array_equal(queue.dequeue(7), data[:7])
+            # the next points come from disk, new points go behind them
+            queue.enqueue(data[30:33])
+            assert_array_equal(queue.dequeue(10), data[7:17])
+            lease = queue.claim(4)
+            assert_array_equal(concatenate(lease.data), data[17:21])
+            queue.commit(lease)
+            assert_array_equal(queue.dequeue_batch(100, 0.0), data[21:31])
+            self.assertEqual(len(listdir(directory)), 1)
+            assert_array_equal(queue.dequeue_batch(100, 0.0), data[31:33])
+            self.assertEqual((queue.backlog, listdir(directory)), (0, []))
+            self.assertEqual(queue.dequeue(1), None)
+            self.assertEqual(queue.dropped, 0)
+            queue.enqueue(data[:25])
+            queue.reset()
+            self.assertEqual((queue.backlog, listdir(directory)), (0, []))
+
+    def test_aligned(self):
+        from ..spilling import SpillingQueue
+        from numpy import arange
+        data = arange(30, dtype='int16').reshape(10, 3)
+        queue = SpillingQueue(shape=(4, 3), dtype='int16', allocation={'align': 64})
+        queue.enqueue(data[:6])
+        self.assertEqual(queue.spilled, 2)
+        assert_array_equal(queue.dequeue(2), data[:2])
+        assert_array_equal(queue.dequeue(4), data[2:6])
+        queue.clear_spill()
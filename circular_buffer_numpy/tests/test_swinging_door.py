@@ -0,0 +1,53 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""test SwingingDoor
+    by Valentyn Stadnytskyi
+    created: October, 2026
+
+    to run unittest: python3 -m unittest test_swinging_door
+"""
+import unittest
+from numpy.testing import assert_array_equal, assert_allclose
+
+
+class SwingingDoorTest(unittest.TestCase):
+    def test_error_bound(self):
+        from ..swinging_door import SwingingDoor
+        from numpy import arange, sin, cumsum, random, stack, abs
+        t = arange(20000) * 0.01
+        values = stack((sin(t), 0.1 * cumsum(random.normal(size=t.shape[0])) * 0.01), axis=1)
+        door = SwingingDoor(error=[0.01, 0.005], channels=2)
+        for i in range(0, 20000, 777):
+            door.compress(t[i:i+777], values[i:i+777])
+        self.assertLess(door.vertices[0].g_pointer + 1, 1000)
+        restored = door.interpolate(t)
+        self.assertLessEqual(abs(restored - values).max(axis=0)[0], 0.01 + 1e-12)
+        self.assertLessEqual(abs(restored - values).max(axis=0)[1], 0.005 + 1e-12)
+        self.assertEqual(door.get_vertices(0)[-1, 0], t[-1])
+
+    def test_line(self):
+        from ..swinging_door import SwingingDoor
+        from numpy import arange, nan
+        t = arange(100.0)
+        door = SwingingDoor(error=0.0)
+        door.compress(t[:50], 2 * t[:50] + 1)
+        door.compress(t[50:], 2 * t[50:] + 1)
+        assert_array_equal(door.get_vertices(0), [[0, 1], [99, 199]])
+        door.compress([100, 101], [0, 0])
+        assert_array_equal(door.get_vertices(0), [[0, 1], [99, 199], [100, 0], [101, 0]])
+        assert_array_equal(door.interpolate([-1, 0.5, 101, 102])[:, 0], [nan, 2, 0, nan])
+
+    def test_consume(self):
+        from ..swinging_door import SwingingDoor
+        from ..circular_buffer import CircularBuffer
+        from numpy import arange, stack
+        t = arange(100.0)
+        buffer = CircularBuffer(shape=(40, 2))
+        door = SwingingDoor(error=0.5)
+        buffer.append(stack((t[:30], t[:30] % 10), axis=1))
+        self.assertEqual(door.consume(buffer), 30)
+        self.assertEqual(door.consume(buffer), 0)
+        buffer.append(stack((t[30:], t[30:] % 10), axis=1))
+        self.assertEqual(door.consume(buffer), 40)
+        self.assertEqual(door.consumed, 99)
+        assert_allclose(door.interpolate([5.0, 95.0])[:, 0], [5, 5], atol=0.5)
@@ -0,0 +1,107 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""test ThreadSafeCircularBuffer
+    by Valentyn Stadnytskyi
+    created: October, 2026
+
+    to run unittest: python3 -m unittest test_threadsafe
+"""
+import unittest
+from numpy.testing import assert_array_equal
+
+
+class ThreadSafeTest(unittest.TestCase):
+    def test_same_as_circular_buffer(self):
+        from ..threadsafe import ThreadSafeCircularBuffer
+        from numpy import arange
+        buffer = ThreadSafeCircularBuffer(shape=(10, 2), dtype='int64')
+        data = arange(30).reshape(15, 2)
+        buffer.append(data)
+        assert_array_equal(buffer.get_data(), data[5:])
+        assert_array_equal(buffer.get_last_N(3), data[-3:])
+        assert_array_equal(buffer.get_N_global(2, 12), data[11:13])
+        self.assertFalse(buffer.get_last_N(3).base is buffer.buffer)
+
+    def test_release_spill(self):
+        from ..threadsafe import ThreadSafeCircularBuffer
+        from numpy import arange
+        from threading import Thread, Event
+        buffer = ThreadSafeCircularBuffer(shape=(10, 2), dtype='int64', lease_policy='spill')
+        data = arange(30).reshape(15, 2)
+        buffer.append(data[:10])
+        lease = buffer.lease(2, M=1)
+        buffer.append(data[10:13])
+        self.assertEqual(len(buffer.spill), 1)
+        released = Event()
+        def release():
+            buffer.release(lease)
+            released.set()
+        # the spilled data is written under the write lock
+        with buffer.lock.read():
+            thread = Thread(target=release)
+            thread.start()
+            self.assertFalse(released.wait(0.05))
+            self.assertEqual(buffer.g_pointer, 9)
+        self.assertTrue(released.wait(1))
+        thread.join()
+        assert_array_equal(buffer.get_data(), data[3:13])
+
+    def test_concurrent_readers(self):
+        from ..threadsafe import RWLock
+        from threading import Thread, Event
+        lock = RWLock()
+        inside = Event()
+        def reader():
+            with lock.read():
+                inside.set()
+        with lock.read():
+            thread = Thread(target=reader)
+            thread.start()
+            self.assertTrue(inside.wait(1))
+        thread.join()
+
+    def test_writer_excludes_readers(self):
+        from ..threadsafe import RWLock
+        from threading import Thread, Event
+        lock = RWLock()
+        inside = Event()
+        def reader():
+            with lock.read():
+                inside.set()
+        with lock.write():
+            with lock.read():
+                pass
+            thread = Thread(target=reader)
+            thread.start()
+            self.assertFalse(inside.wait(0.05))
+        self.assertTrue(inside.wait(1))
+        thread.join()
+        with lock.read():
+            with self.assertRaises(Exception):
+                lock.acquire_write()
+
+    def test_threaded(self):
+        from ..threadsafe import ThreadSafeCircularBuffer
+        from numpy import ones, diff, all
+        from threading import Thread
+        buffer = ThreadSafeCircularBuffer(shape=(16, 8), dtype='int64')
+        buffer.append(ones((16, 8), dtype='int64') * -1)
+        def writer():
+            for i in range(2000):
+                buffer.append(ones((1, 8), dtype='int64') * i)
+        errors = []
+        def reader():
+            while thread.is_alive():
+                data = buffer.get_last_N(4)
+                if not (all(data == data[:, :1]) and (data[0, 0] < 0 or all(diff(data[:, 0]) == 1))):
+                    errors.append(data)
+        thread = Thread(target=writer)
+        thread.start()
+        readers = [Thread(target=reader) for i in range(3)]
+        for r in readers:
+            r.start()
+        thread.join()
+        for r in readers:
+            r.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(buffer.g_pointer, 2015)
@@ -0,0 +1,82 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""test TieredCircularBuffer
+    by Valentyn Stadnytskyi
+    created: October, 2026
+
+    to run unittest: python3 -m unittest test_tiered
+"""
+import unittest
+from numpy.testing import assert_array_equal
+
+
+class TieredCircularBufferTest(unittest.TestCase):
+    def test_tiers(self):
+        from ..tiered import TieredCircularBuffer
+        from numpy import arange
+        from tempfile import TemporaryDirectory
+        from os.path import join
+        data = arange(400.0).reshape(200, 2)
+        with TemporaryDirectory() as directory:
+            buffer = TieredCircularBuffer(join(directory, 'cold.npy'), hot_length=10, cold_length=64,
+                                          data_shape=(2,))
+            buffer.append(data[:7])
+            self.assertEqual((buffer.lag, buffer.length), (7, 7))
+            assert_array_equal(buffer.get_last_N(7), data[:7])
+            # the points are migrated before the hot ring overwrites them
+            buffer.append(data[7:30])
+            self.assertEqual((buffer.g_pointer, buffer.length), (29, 30))
+            assert_array_equal(buffer.get_last_N(30), data[:30])
+            self.assertEqual(buffer.lag, 3)
+            self.assertEqual(buffer.migrate(), 3)
+            assert_array_equal(buffer.get_N_global(12, 25), data[14:26])
+            for i in range(30, 200, 17):
+                buffer.append(data[i:i + 17])
+            buffer.migrate()
+            self.assertEqual(buffer.length, 64)
+            assert_array_equal(buffer.get_last_N(64), data[136:200])
+            assert_array_equal(buffer.get_N_global(5, 140), data[136:141])
+            with self.assertRaises(Exception):
+                buffer.get_N_global(5, 139)
+
+    def test_reopen(self):
+        from ..tiered import TieredCircularBuffer
+        from numpy import arange
+        from tempfile import TemporaryDirectory
+        from os.path import join
+        data = arange(400.0).reshape(200, 2)
+        with TemporaryDirectory() as directory:
+            path = join(directory, 'cold.npy')
+            buffer = TieredCircularBuffer(path, hot_length=10, cold_length=64, data_shape=(2,))
+            buffer.append(data[:150])
+            buffer.stop()
+            buffer.append(data[150:153])
+            del buffer
+            # the points that were not migrated are lost
+            buffer = TieredCircularBuffer(path, hot_length=10, cold_length=64, data_shape=(2,))
+            self.assertEqual((buffer.g_pointer, buffer.migrated, buffer.length), (149, 149, 64))
+            assert_array_equal(buffer.get_last_N(64), data[86:150])
+            buffer.append(data[150:200])
+            buffer.migrate()
+            assert_array_equal(buffer.get_last_N(64), data[136:200])
+            with self.assertRaises(Exception):
+                TieredCircularBuffer(path, hot_length=10, cold_length=32, data_shape=(2,))
+
+    def test_thread(self):
+        from ..tiered import TieredCircularBuffer
+        from numpy import arange, load
+        from tempfile import TemporaryDirectory
+        from os.path import join
+        from time import sleep
+        data = arange(2000.0).reshape(1000, 2)
+        with TemporaryDirectory() as directory:
+            path = join(directory, 'cold.npy')
+            buffer = TieredCircularBuffer(path, hot_length=100, cold_length=1000, data_shape=(2,), interval=0.001)
+            buffer.start()
+            for i in range(0, 1000, 50):
+                buffer.append(data[i:i + 50])
+                sleep(0.001)
+            buffer.stop()
+            self.assertEqual(buffer.lag, 0)
+            assert_array_equal(buffer.get_last_N(1000), data)
+            assert_array_equal(load(path), data)
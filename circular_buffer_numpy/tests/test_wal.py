@@ -0,0 +1,85 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""test WriteAheadLog
+    by Valentyn Stadnytskyi
+    created: October, 2026
+
+    to run unittest: python3 -m unittest test_wal
+"""
+import unittest
+from numpy.testing import assert_array_equal
+
+
+class WriteAheadLogTest(unittest.TestCase):
+    def test_recover(self):
+        from ..wal import WriteAheadLog
+        from ..queue import Queue
+        from numpy import arange
+        from os import listdir
+        from tempfile import TemporaryDirectory
+        data = arange(200, dtype='int16').reshape(100, 2)
+        with TemporaryDirectory() as directory:
+            wal = WriteAheadLog(directory, fsync_interval=0.0, segment_bytes=4*6)
+            queue = Queue(shape=(10, 2), dtype='int16', wal=wal)
+            queue.enqueue(data[:6])
+            assert_array_equal(queue.dequeue(4), data[:4])
+            queue.enqueue(data[6:9])
+            i = 9
+            for segment in queue.reserve(3):
+                segment[:] = data[i:i + segment.shape[0]]
+                i += segment.shape[0]
+            queue.publish(3)
+            lease = queue.claim(3)
+            queue.commit(lease)
+            lease = queue.claim(2)
+            # the committed segments are deleted
+            logs = [name for name in listdir(directory) if name.endswith('.log')]
+            self.assertEqual(logs, ['wal_000000000000006.log'])
+            del queue  # crash, the lease was not committed
+            queue = Queue(shape=(10, 2), dtype='int16', wal=WriteAheadLog(directory, fsync_interval=0.0))
+            self.assertEqual((queue.length, queue.global_rear), (5, 12))
+            assert_array_equal(queue.dequeue(5), data[7:12])
+            # the rows after the last complete one are cut off
+            queue.enqueue(data[12:16])
+            queue.wal.file.write(b'\x01')
+            queue.wal.sync()
+            queue = Queue(shape=(10, 2), dtype='int16', wal=WriteAheadLog(directory))
+            assert_array_equal(queue.dequeue(4), data[12:16])
+            # only the last points of a long block are logged
+            queue.enqueue(data[16:40])
+            queue.dequeue(3)
+            queue.wal.close()
+            queue = Queue(shape=(10, 2), dtype='int16', wal=WriteAheadLog(directory))
+            self.assertEqual(queue.global_rear, 40)
+            assert_array_equal(queue.dequeue(7), data[33:40])
+            with self.assertRaises(Exception):
+                Queue(shape=(10, 3), dtype='int16', wal=WriteAheadLog(directory))
+            queue.reset()
+            self.assertEqual(Queue(shape=(10, 2), dtype='int16', wal=WriteAheadLog(directory)).length, 0)
+
+    def test_load_aligned(self):
+        from ..wal import WriteAheadLog
+        from ..queue import Queue
+        from numpy import arange
+        from tempfile import TemporaryDirectory
+        from os.path import join
+        data = arange(60, dtype='int16').reshape(20, 3)
+        with TemporaryDirectory() as directory:
+            saved = Queue(shape=(10, 3), dtype='int16')
+            saved.enqueue(data[:17])
+            saved.dequeue(7)
+            path = join(directory, 'queue.npy')
+            saved.save(path)
+            # padded rows are logged and recovered
+            log = join(directory, 'wal')
+            queue = Queue(shape=(10, 3), dtype='int16', allocation={'align': 64}, wal=WriteAheadLog(log))
+            queue.enqueue(data[:2])
+            self.assertEqual(queue.length, 2)
+            # load replaces the log
+            queue.load(path)
+            self.assertEqual((queue.global_rear, queue.wal.end, queue.wal.offset), (17, 17, 14))
+            queue.enqueue(data[17:20])
+            queue.wal.close()
+            queue = Queue(shape=(10, 3), dtype='int16', allocation={'align': 64}, wal=WriteAheadLog(log))
+            self.assertEqual((queue.global_rear, queue.length), (20, 6))
+            assert_array_equal(queue.dequeue(6), data[14:20])
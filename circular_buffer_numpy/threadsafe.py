@@ -0,0 +1,196 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""Thread-safe circular buffer
+    by Valentyn Stadnytskyi
+    created: October, 2026
+A circular buffer that can be shared between threads. A reader-writer lock
+lets many threads call get_* methods at the same time, while append and the
+other methods that change the buffer run exclusively.
+The get_* methods of the thread-safe buffer return copies: a view of the
+buffer would be overwritten by the next append after the lock is released.
+"""
+
+import logging
+from logging import debug, info, warn, error
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+from threading import Condition, Lock, local, get_ident
+
+from .circular_buffer import CircularBuffer
+
+
+class RWLock(object):
+    """
+    reader-writer lock: many readers or one writer. Waiting writers have
+    priority over new readers, so a steady stream of readers cannot starve
+    the writer. Both locks are reentrant and the thread that holds the write
+    lock can also read.
+
+    Examples
+    --------
+    >>> lock = RWLock()
+    >>> with lock.read():
+    ...     pass
+    >>> with lock.write():
+    ...     pass
+    """
+    def __init__(self):
+        self.condition = Condition(Lock())
+        self.readers = 0
+        self.writer = None
+        self.writes = 0
+        self.waiting_writers = 0
+        self._local = local()
+
+    def acquire_read(self):
+        reads = getattr(self._local, 'reads', 0)
+        if reads or self.writer == get_ident():
+            # nested read, or read inside of a write.
+            self._local.reads = reads + 1
+            return
+        with self.condition:
+            while self.writer is not None or self.waiting_writers:
+                self.condition.wait()
+            self.readers += 1
+        self._local.reads = 1
+
+    def release_read(self):
+        self._local.reads -= 1
+        if self._local.reads or self.writer == get_ident():
+            return
+        with self.condition:
+            self.readers -= 1
+            if not self.readers:
+                self.condition.notify_all()
+
+    def acquire_write(self):
+        if self.writer == get_ident():
+            self.writes += 1
+            return
+        if getattr(self._local, 'reads', 0):
+            raise Exception('cannot acquire the write lock while holding the read lock')
+        with self.condition:
+            self.waiting_writers += 1
+            while self.writer is not None or self.readers:
+                self.condition.wait()
+            self.waiting_writers -= 1
+            self.writer = get_ident()
+            self.writes = 1
+
+    def release_write(self):
+        self.writes -= 1
+        if self.writes:
+            return
+        with self.condition:
+            self.writer = None
+            self.condition.notify_all()
+
+    def read(self):
+        """
+        returns a context manager that holds the read lock.
+        """
+        return _Locked(self.acquire_read, self.release_read)
+
+    def write(self):
+        """
+        returns a context manager that holds the write lock.
+        """
+        return _Locked(self.acquire_write, self.release_write)
+
+
+class _Locked(object):
+    def __init__(self, acquire, release):
+        self.acquire = acquire
+        self.release = release
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+def _reading(method):
+    def wrapper(self, *args, **kwargs):
+        from numpy import ndarray
+        with self.lock.read():
+            result = method(self, *args, **kwargs)
+            if isinstance(result, ndarray) and result.flags.writeable:
+                # read-only results are cached snapshots (cache=True), not views.
+                result = result.copy()
+        return result
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+def _writing(method):
+    def wrapper(self, *args, **kwargs):
+        with self.lock.write():
+            return method(self, *args, **kwargs)
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+class ThreadSafeCircularBuffer(CircularBuffer):
+    """
+    circular buffer that can be shared between threads. The get_* methods
+    hold the read lock and return copies, append, append_from, reset and
+    change_length hold the write lock.
+
+    The zero-copy producer API is not locked by itself, reserve and commit
+    have to be called while holding the write lock:
+
+    >>> buffer = ThreadSafeCircularBuffer(shape = (10,4))
+    >>> with buffer.lock.write():
+    ...     for segment in buffer.reserve(6):
+    ...         segment[:] = 1.0
+    ...     buffer.commit(6)
+
+    Snapshots are read without the lock, append copies the segments that a
+    snapshot needs before it overwrites them, but get_data of a snapshot
+    that runs at the same time as append has to hold buffer.lock.read().
+
+    Reader leases (lease, release) are not affected by the lock, except that
+    with the 'spill' lease policy release holds the write lock while it
+    appends the spilled data. With the 'block' lease policy, append waits
+    for the lease while holding the write lock and readers wait for append.
+    """
+    def __init__(self, *args, **kwargs):
+        self.lock = RWLock()
+        CircularBuffer.__init__(self, *args, **kwargs)
+
+    append = _writing(CircularBuffer.append)
+    append_from = _writing(CircularBuffer.append_from)
+    reset = _writing(CircularBuffer.reset)
+    change_length = _writing(CircularBuffer.change_length)
+    invalidate = _writing(CircularBuffer.invalidate)
+    load = _writing(CircularBuffer.load)
+
+    def release(self, lease):
+        if self.lease_policy == 'spill':
+            # release writes the spilled data. append never waits for a
+            # lease with this policy, so it cannot hold the write lock while
+            # waiting for this release.
+            with self.lock.write():
+                return CircularBuffer.release(self, lease)
+        return CircularBuffer.release(self, lease)
+    release.__doc__ = CircularBuffer.release.__doc__
+
+    get_all = _reading(CircularBuffer.get_all)
+    get_data = _reading(CircularBuffer.get_data)
+    get_last_N = _reading(CircularBuffer.get_last_N)
+    get_last_value = _reading(CircularBuffer.get_last_value)
+    get_value = _reading(CircularBuffer.get_value)
+    get_i_j = _reading(CircularBuffer.get_i_j)
+    get_N = _reading(CircularBuffer.get_N)
+    get_N_global = _reading(CircularBuffer.get_N_global)
+    get_valid = _reading(CircularBuffer.get_valid)
+    get_indices = _reading(CircularBuffer.get_indices)
+    get_step_series = _reading(CircularBuffer.get_step_series)
+    get_packet_linear_i_j = _reading(CircularBuffer.get_packet_linear_i_j)
+    get_packet_circular_i_j = _reading(CircularBuffer.get_packet_circular_i_j)
+    snapshot = _reading(CircularBuffer.snapshot)
+    save = _reading(CircularBuffer.save)
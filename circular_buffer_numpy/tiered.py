@@ -0,0 +1,255 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""Tiered circular buffer
+    by Valentyn Stadnytskyi
+    created: October, 2026
+A circular buffer in two tiers: a hot CircularBuffer in RAM for the newest
+points and a much longer cold ring in a memory-mapped .npy file for the
+history. A background thread migrates the new points to the cold ring in
+bulk, long before the hot ring overwrites them. get_N_global and get_last_N
+read from whichever tiers hold the requested points. The cold ring and the
+global index of its last point (path + '.migrated') survive a restart.
+"""
+
+import logging
+from logging import debug, info, warn, warning, error
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+from .circular_buffer import CircularBuffer
+
+
+class TieredCircularBuffer(object):
+    """
+    hot RAM ring backed by a cold memory-mapped ring. Every point is copied
+    to the cold ring, points that are still in the hot ring are read from
+    RAM. If the thread falls behind, append migrates before it would
+    overwrite points that are not in the cold ring yet, so no point is lost.
+
+    A buffer created with the path of an existing cold ring continues after
+    the last migrated point, the newest points of the cold ring are copied
+    to the hot ring. Points that were appended but not migrated before the
+    process ended are lost.
+
+    :ivar hot: CircularBuffer in RAM
+    :ivar cold: memory-mapped ring of cold_length points
+    :ivar migrated: global index of the last point copied to the cold ring
+
+    Examples
+    --------
+    >>> buffer = TieredCircularBuffer('/data/history.npy', hot_length = 10**6, cold_length = 10**9,
+    ...                               data_shape = (4,))
+    >>> buffer.start()
+    >>> buffer.append(data)
+    >>> day = buffer.get_last_N(86400 * 1000)
+    """
+    def __init__(self, path, hot_length=2**16, cold_length=2**24, data_shape=(2,), dtype='float64', interval=0.1,
+                 **kwargs):
+        """
+        Parameters
+        ----------
+        path :: string
+            path of the .npy file of the cold ring, reopened if it exists
+        hot_length :: integer
+            number of points in RAM
+        cold_length :: integer
+            number of points on disk
+        data_shape :: tuple
+            shape of one point
+        dtype :: dtype
+            data type of the points
+        interval :: float
+            how often the thread migrates new points, in seconds
+        kwargs :: dictionary
+            other options of the hot CircularBuffer
+        """
+        from numpy.lib.format import open_memmap
+        from numpy import frombuffer, arange
+        from os.path import exists
+        from threading import Lock
+        self.hot = CircularBuffer(shape=(hot_length,) + tuple(data_shape), dtype=dtype, **kwargs)
+        shape = (cold_length,) + tuple(data_shape)
+        self.state_path = path + '.migrated'
+        self.migrated = -1
+        if exists(path):
+            self.cold = open_memmap(path, mode='r+')
+            if self.cold.dtype != self.hot.dtype or self.cold.shape != shape:
+                raise Exception('{} holds a cold ring of {} {}, expected {} {}'.format(
+                    path, self.cold.shape, self.cold.dtype, shape, self.hot.dtype))
+            if exists(self.state_path):
+                with open(self.state_path, 'rb') as file:
+                    saved = file.read(8)
+                self.migrated = int(frombuffer(saved, dtype='int64')[0]) if len(saved) == 8 else -1
+        else:
+            self.cold = open_memmap(path, mode='w+', dtype=self.hot.dtype, shape=shape)
+        if self.migrated >= 0:
+            # the hot ring continues with the newest cold points.
+            k = min(hot_length, cold_length, self.migrated + 1)
+            self.hot.g_pointer = self.migrated - k
+            self.hot.pointer = self.hot.g_pointer % hot_length if self.hot.g_pointer >= 0 else -1
+            self.hot.append(self.cold[arange(self.migrated - k + 1, self.migrated + 1) % cold_length])
+            debug('reopened {} at global index {}'.format(path, self.migrated))
+        self.lock = Lock()  # one migration at a time
+        self.interval = interval
+        self.running = False
+        self.thread = None
+
+    def append(self, data):
+        """
+        appends data to the hot ring, see CircularBuffer.append.
+        """
+        from numpy import asarray
+        data = asarray(data).reshape((-1,) + self.hot.data_shape)
+        H = self.hot.length
+        for i in range(0, data.shape[0], H):
+            chunk = data[i:i + H]
+            if self.hot.g_pointer + chunk.shape[0] - self.migrated > H:
+                self.migrate()
+            self.hot.append(chunk)
+
+    def migrate(self):
+        """
+        copies the points appended since the last migration from the hot
+        ring to the cold ring, straight from ring to ring.
+
+        Returns
+        -------
+        n :: integer
+            number of points migrated
+        """
+        with self.lock:
+            last = self.hot.g_pointer
+            start = self.migrated + 1
+            n = last - self.migrated
+            H, C = self.hot.length, self.cold.shape[0]
+            if n > H:
+                # points appended to hot directly, not through append.
+                warning('{} points were overwritten before they were migrated'.format(n - H))
+            # only the points still in the hot ring and the last cold_length points.
+            start = max(start, last - min(H, C) + 1)
+            while start <= last:
+                a, b = start % H, start % C
+                k = min(last - start + 1, H - a, C - b)
+                self.cold[b:b + k] = self.hot.buffer[a:a + k]
+                start += k
+            if n > 0:
+                self.migrated = last
+                self._save_migrated()
+        return max(0, n)
+
+    def _save_migrated(self):
+        """
+        writes the global index of the last migrated point next to the cold
+        ring, in place.
+        """
+        from os import open as os_open, pwrite, close, O_WRONLY, O_CREAT
+        from numpy import array
+        fd = os_open(self.state_path, O_WRONLY | O_CREAT)
+        try:
+            pwrite(fd, array(self.migrated, dtype='int64').tobytes(), 0)
+        finally:
+            close(fd)
+
+    def start(self):
+        """
+        starts the migration loop in a daemon thread.
+        """
+        from threading import Thread
+        self.running = True
+        self.thread = Thread(target=self.run, name='tiered', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        stops the migration loop, migrates the remaining points and flushes
+        the cold ring to disk.
+        """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.migrate()
+        self.cold.flush()
+
+    def run(self):
+        """
+        the migration loop: migrates the new points every interval seconds
+        until stopped.
+        """
+        from time import sleep
+        while self.running:
+            self.migrate()
+            sleep(self.interval)
+
+    def get_N_global(self, N=0, M=0):
+        """
+        returns a copy of N points before global index M (including M), the
+        newer points from the hot ring, the older ones from the cold ring.
+
+        Parameters
+        ----------
+        N : integer
+            number of points to return
+        M : integer
+            global index of the last point
+
+        Returns
+        -------
+        array : array_like
+
+        Examples
+        --------
+        >>> data = buffer.get_N_global(N=2, M=5)
+        """
+        from numpy import concatenate
+        first = M - N + 1
+        if N < 0 or M > self.g_pointer or (N and first < self.first):
+            raise Exception('points {} to {} are not in the buffer'.format(first, M))
+        hot_first = max(0, self.hot.g_pointer - self.hot.length + 1)
+        pieces = [self.cold[:0]]
+        # the cold points: first to hot_first - 1
+        start, C = first, self.cold.shape[0]
+        while start <= min(M, hot_first - 1):
+            b = start % C
+            k = min(min(M, hot_first - 1) - start + 1, C - b)
+            pieces.append(self.cold[b:b + k])
+            start += k
+        if N and M >= hot_first:
+            k = M - max(first, hot_first) + 1
+            pieces.append(CircularBuffer.get_N_global(self.hot, k, M))
+        return concatenate(pieces)
+
+    def get_last_N(self, N):
+        """
+        returns a copy of the last N points, see get_N_global.
+        """
+        return self.get_N_global(N, self.g_pointer)
+
+    @property
+    def g_pointer(self):
+        """
+        integer: global index of the last point
+        """
+        return self.hot.g_pointer
+
+    @property
+    def first(self):
+        """
+        integer: global index of the oldest point in either tier
+        """
+        hot_first = self.hot.g_pointer - self.hot.length + 1
+        cold_first = self.migrated - self.cold.shape[0] + 1
+        return max(0, min(hot_first, cold_first))
+
+    @property
+    def length(self):
+        """
+        integer: number of points in either tier
+        """
+        return self.g_pointer + 1 - self.first
+
+    @property
+    def lag(self):
+        """
+        integer: number of points not migrated to the cold ring yet
+        """
+        return self.hot.g_pointer - self.migrated
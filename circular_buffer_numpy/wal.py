@@ -0,0 +1,210 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""Write-ahead log
+    by Valentyn Stadnytskyi
+    created: October, 2026
+Write-ahead log of a Queue. Every published point is appended to a log
+segment before the queue makes it visible, every dequeue and commit moves the
+committed offset forward. After a crash, a Queue created with the same log
+is rebuilt from the points after the committed offset.
+The log is made durable with group commit: the segment and the offset are
+synced to disk at most once every fsync_interval seconds, not once per
+enqueue.
+"""
+
+import logging
+from logging import debug, info, warn, warning, error
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+
+class WriteAheadLog(object):
+    """
+    write-ahead log in a directory. The segments are raw points, named after
+    the global index of their first point, the committed offset is an int64
+    in the file offset. Segments with committed points only are deleted.
+
+    :ivar offset: global index of the first point that was not committed
+    :ivar end: global index after the last point in the log
+    :ivar fsync_interval: seconds between syncs, 0 syncs every append and
+        commit, None leaves the writing to the operating system
+
+    Examples
+    --------
+    >>> queue = Queue(shape = (10**5, 64), dtype = 'int16', wal = WriteAheadLog('/data/wal'))
+    """
+    def __init__(self, directory, fsync_interval=0.01, segment_bytes=2**26):
+        from os import makedirs
+        makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.segment_bytes = segment_bytes
+        self.segments = []  # [global index of the first point, number of points], oldest first
+        self.file = None  # segment open for appending
+        self.offset = 0
+        self.end = 0
+        self.synced = 0.0  # monotonic time of the last sync
+        self.row_bytes = None
+
+    def _path(self, name):
+        from os.path import join
+        return join(self.directory, name)
+
+    def attach(self, dtype, data_shape):
+        """
+        opens the log for points of the given dtype and data_shape and
+        returns the committed offset and the end of the log. A point that
+        was only partly written before a crash is cut off.
+
+        Returns
+        -------
+        offset, end :: tuple of integers
+        """
+        from os import listdir, open as os_open, O_RDWR, O_CREAT
+        from os.path import exists, getsize
+        from numpy import dtype as numpy_dtype, frombuffer, prod
+        from .persist import header
+        self.row_bytes = max(1, numpy_dtype(dtype).itemsize * int(prod(data_shape, dtype='int64')))
+        signature = header(dtype, (0,) + tuple(data_shape))
+        if exists(self._path('format')):
+            with open(self._path('format'), 'rb') as file:
+                if file.read() != signature:
+                    raise Exception('the log in {} holds points of another dtype or shape'.format(self.directory))
+        else:
+            with open(self._path('format'), 'wb') as file:
+                file.write(signature)
+        self.segments = []
+        for name in sorted(listdir(self.directory)):
+            if name.startswith('wal_') and name.endswith('.log'):
+                rows = getsize(self._path(name)) // self.row_bytes
+                with open(self._path(name), 'r+b') as file:
+                    file.truncate(rows * self.row_bytes)
+                self.segments.append([int(name[4:-4]), rows])
+        self.fd = os_open(self._path('offset'), O_RDWR | O_CREAT)
+        with open(self._path('offset'), 'rb') as file:
+            saved = file.read(8)
+        self.end = self.segments[-1][0] + self.segments[-1][1] if self.segments else 0
+        self.offset = int(frombuffer(saved, dtype='int64')[0]) if len(saved) == 8 else 0
+        if self.segments and self.segments[0][0] > self.offset:
+            warning('points {} to {} are missing in the log'.format(self.offset, self.segments[0][0]))
+            self.offset = self.segments[0][0]
+        # the offset can be synced before the points it follows.
+        self.end = max(self.end, self.offset)
+        return self.offset, self.end
+
+    def read_into(self, start, segments):
+        """
+        reads the points from global index start into the segments, in place.
+        """
+        from .persist import read_into
+        for segment in segments:
+            i = 0
+            while i < segment.shape[0]:
+                first, rows = [s for s in self.segments if s[0] <= start < s[0] + s[1]][0]
+                n = min(segment.shape[0] - i, first + rows - start)
+                with open(self._path('wal_{:015d}.log'.format(first)), 'rb') as file:
+                    file.seek((start - first) * self.row_bytes)
+                    read_into(file, [segment[i:i + n]])
+                i += n
+                start += n
+
+    def append(self, segments):
+        """
+        appends the points in segments to the log.
+        """
+        from .persist import write_from
+        n = sum(segment.shape[0] for segment in segments)
+        if n == 0:
+            return
+        if self.file is None or self.segments[-1][1] * self.row_bytes >= self.segment_bytes:
+            self._roll()
+        for segment in segments:
+            write_from(self.file, segment)
+        self.segments[-1][1] += n
+        self.end += n
+        self._maybe_sync()
+
+    def skip(self, n):
+        """
+        moves the end of the log by n points that are not logged, the next
+        point starts a new segment.
+        """
+        if n <= 0:
+            return
+        if self.file is not None:
+            self.sync()
+            self.file.close()
+            self.file = None
+        self.end += n
+
+    def _roll(self):
+        """
+        starts a new segment at the end of the log.
+        """
+        if self.file is not None:
+            self.sync()
+            self.file.close()
+        if self.segments and self.segments[-1] == [self.end, 0]:
+            # an empty segment left by a crash is reused.
+            self.segments.pop()
+        self.segments.append([self.end, 0])
+        self.file = open(self._path('wal_{:015d}.log'.format(self.end)), 'wb')
+
+    def commit(self, offset):
+        """
+        moves the committed offset to the global index offset.
+        """
+        from os import pwrite
+        from numpy import array
+        if offset <= self.offset:
+            return
+        self.offset = offset
+        pwrite(self.fd, array(offset, dtype='int64').tobytes(), 0)
+        self._maybe_sync()
+
+    def _maybe_sync(self):
+        from time import monotonic
+        if self.fsync_interval is not None and monotonic() - self.synced >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        """
+        writes the log and the offset to disk and deletes the segments with
+        committed points only.
+        """
+        from os import fsync, remove
+        from time import monotonic
+        if self.file is not None:
+            self.file.flush()
+            fsync(self.file.fileno())
+        # the points first, so that the offset does not run ahead of them.
+        fsync(self.fd)
+        self.synced = monotonic()
+        while len(self.segments) > 1 and self.segments[0][0] + self.segments[0][1] <= self.offset:
+            first, rows = self.segments.pop(0)
+            remove(self._path('wal_{:015d}.log'.format(first)))
+
+    def reset(self):
+        """
+        deletes all points and starts the log at global index 0.
+        """
+        from os import remove, pwrite
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        for first, rows in self.segments:
+            remove(self._path('wal_{:015d}.log'.format(first)))
+        self.segments = []
+        self.offset = self.end = 0
+        pwrite(self.fd, bytes(8), 0)
+        self.sync()
+
+    def close(self):
+        """
+        syncs and closes the log.
+        """
+        from os import close
+        self.sync()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        close(self.fd)
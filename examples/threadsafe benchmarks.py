@@ -0,0 +1,67 @@
+from circular_buffer_numpy import __version__
+from circular_buffer_numpy.circular_buffer import CircularBuffer
+from circular_buffer_numpy.threadsafe import ThreadSafeCircularBuffer
+
+from numpy import random
+from threading import Thread, Lock
+import timeit
+
+print('circular buffer numpy version: {}'.format(__version__))
+number = 100000
+data = random.randint(2**16, size=(1, 10))
+
+
+def single_thread(buffer):
+    t_write = timeit.timeit(lambda: buffer.append(data), number=number)
+    t_read = timeit.timeit(lambda: buffer.get_last_N(10), number=number)
+    return t_write/number, t_read/number
+
+
+def shared(buffer, n_readers, read):
+    """
+    time per read with n_readers threads reading while one thread appends.
+    """
+    def writer():
+        for i in range(number):
+            buffer.append(data)
+
+    def reader():
+        for i in range(number//n_readers):
+            read()
+    threads = [Thread(target=writer)] + [Thread(target=reader) for i in range(n_readers)]
+    t = timeit.default_timer()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return (timeit.default_timer() - t)/number
+
+
+class CoarseLockedCircularBuffer(CircularBuffer):
+    """
+    what users do without ThreadSafeCircularBuffer: one lock for everything.
+    """
+    def __init__(self, *args, **kwargs):
+        self.lock = Lock()
+        CircularBuffer.__init__(self, *args, **kwargs)
+
+    def append(self, data):
+        with self.lock:
+            CircularBuffer.append(self, data)
+
+    def get_last_N(self, N):
+        with self.lock:
+            return CircularBuffer.get_last_N(self, N).copy()
+
+
+buffer = CircularBuffer(shape=(10000, 10))
+print('unlocked: {:.3g} s per write, {:.3g} s per read'.format(*single_thread(buffer)))
+buffer = ThreadSafeCircularBuffer(shape=(10000, 10))
+print('rw-locked: {:.3g} s per write, {:.3g} s per read'.format(*single_thread(buffer)))
+
+for n_readers in [1, 4]:
+    buffer = ThreadSafeCircularBuffer(shape=(10000, 10))
+    t_rw = shared(buffer, n_readers, lambda: buffer.get_last_N(10))
+    coarse = CoarseLockedCircularBuffer(shape=(10000, 10))
+    t_coarse = shared(coarse, n_readers, lambda: coarse.get_last_N(10))
+    print('{} readers: rw-locked {:.3g} s, coarse lock {:.3g} s per append and read'.format(n_readers, t_rw, t_coarse))